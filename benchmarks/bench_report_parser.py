@@ -0,0 +1,60 @@
+"""Микробенчмарк разбора эмбедов отчетов.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_report_parser -n 100000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timezone
+import discord
+from utils.report_parser import REPORT_TITLE, parse_report_embeds
+
+EVENT_NAMES = ["Мафия", "Кино", "Квиз", "Крокодил", "Шляпа", "Бункер", "Codenames", "Ночной эфир"]
+
+
+def make_embeds(count, seed=0):
+    """Синтетические эмбеды: в основном отчеты, немного посторонних и неполных."""
+    rng = random.Random(seed)
+    embeds = []
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.05:
+            embeds.append(discord.Embed(title="Объявление", description="Сегодня в 20:00 ивент!"))
+            continue
+        user_id = rng.randrange(10**17, 10**18)
+        embed = discord.Embed(title=REPORT_TITLE, description=f"<@{user_id}> `nick_{user_id % 1000}`")
+        embed.add_field(name="> Ведущий", value=f"<@{user_id}>")
+        embed.add_field(name="> Ивент", value=f"`{rng.choice(EVENT_NAMES)}`")
+        if kind > 0.07:
+            embed.add_field(name="> Получено", value=f"`{rng.randint(1, 240)}` баллов")
+        embeds.append(embed)
+    return embeds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--count', type=int, default=100_000, help="количество эмбедов")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="количество повторов (берется лучший)")
+    args = parser.parse_args()
+
+    embeds = make_embeds(args.count)
+    created_at = datetime.now(timezone.utc)
+    # По одному эмбеду на сообщение, как в канале парсинга
+    messages = [(i, [embed]) for i, embed in enumerate(embeds)]
+
+    best = float('inf')
+    parsed = 0
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        parsed = 0
+        for message_id, message_embeds in messages:
+            parsed += len(parse_report_embeds(message_id, created_at, message_embeds))
+        best = min(best, time.perf_counter() - start)
+
+    print(f"Эмбедов: {args.count}, распознано отчетов: {parsed}")
+    print(f"Лучшее время: {best * 1000:.1f} мс, {args.count / best:,.0f} эмбедов/с, {best / args.count * 1e6:.2f} мкс/эмбед")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Бенчмарк отчетов на локальном подставном канале парсинга.
+
+Канал отдает N синтетических сообщений с отчетами: участники и ивенты распределены неравномерно,
+часть отчетов переопределена ручными записями, есть и самостоятельные ручные начисления.
+Для каждого объема замеряются _get_events_in_range + generate_log_file по всем типам логов
+и все отчеты /makser — как при чтении истории канала, так и из заполненного локального индекса.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_reports -n 1000 10000 100000
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from utils.offline_env import stub_bot_env
+
+# main.py читает эти переменные при создании бота и когов; канал подменяется ниже
+stub_bot_env()
+
+import discord
+from discord.utils import snowflake_time, time_snowflake
+from main import MyBot, intents
+from cogs.logs_cog import LogsCog
+from import_export import OfflineGuild
+from utils.report_parser import REPORT_TITLE
+
+# Сколько сообщений Discord отдает за один запрос истории
+HISTORY_PAGE_SIZE = 100
+MOSCOW_TZ = timezone(timedelta(hours=3))
+PERIOD_START = datetime(2025, 9, 1, tzinfo=MOSCOW_TZ)
+PERIOD_DAYS = 30
+DATE_RANGE = "01.09.2025-30.09.2025"
+
+EVENT_NAMES = ["Мафия", "Кино", "Квиз", "Крокодил", "Шляпа", "Бункер", "Codenames", "Ночной эфир",
+               "Караоке", "Своя игра", "Alias", "Дурак", "Монополия", "Among Us", "Шахматы"]
+CATEGORIES = {
+    "Игры": ["Мафия", "Крокодил", "Шляпа", "Бункер", "Codenames", "Alias", "Дурак", "Монополия", "Among Us"],
+    "Эфиры": ["Кино", "Ночной эфир", "Караоке"],
+    "Интеллект": ["Квиз", "Своя игра"],
+}
+LOG_TYPES = [
+    ('general', None),
+    ('category', "Игры"),
+    ('night_log', None),
+    ('check', None),
+    ('makser', "__all__"),
+    ('eventstats', None),
+]
+
+
+class FakeMessage:
+    __slots__ = ('id', 'created_at', 'embeds')
+
+    def __init__(self, message_id, embeds):
+        self.id = message_id
+        self.created_at = snowflake_time(message_id)
+        self.embeds = embeds
+
+
+class FakeParseChannel:
+    """Канал, история которого хранится в памяти. Считает запросы так, как их делал бы discord.py."""
+
+    def __init__(self, messages, page_latency=0.0):
+        self.messages = sorted(messages, key=lambda m: m.id)
+        self.ids = [m.id for m in self.messages]
+        self.page_latency = page_latency
+        self.pages = 0
+        self.guild = OfflineGuild()
+
+    async def history(self, limit=100, before=None, after=None, oldest_first=None):
+        lo = bisect.bisect_right(self.ids, _snowflake(after)) if after is not None else 0
+        hi = bisect.bisect_left(self.ids, _snowflake(before)) if before is not None else len(self.ids)
+        if oldest_first is None:
+            oldest_first = after is not None
+        selected = self.messages[lo:hi] if oldest_first else self.messages[lo:hi][::-1]
+        if limit is not None:
+            selected = selected[:limit]
+        for offset in range(0, max(len(selected), 1), HISTORY_PAGE_SIZE):
+            self.pages += 1
+            if self.page_latency:
+                await asyncio.sleep(self.page_latency)
+            for message in selected[offset:offset + HISTORY_PAGE_SIZE]:
+                yield message
+
+
+def _snowflake(value):
+    return value.id if hasattr(value, 'id') else time_snowflake(value)
+
+
+def make_dataset(count, seed=0):
+    """Сообщения с отчетами и ручные записи. Активность участников и популярность ивентов — по Ципфу."""
+    rng = random.Random(seed)
+    users = [10**17 + rng.randrange(10**17) for _ in range(max(20, count // 200))]
+    user_weights = [1 / rank for rank in range(1, len(users) + 1)]
+    event_weights = [1 / rank for rank in range(1, len(EVENT_NAMES) + 1)]
+    span = PERIOD_DAYS * 24 * 60 * 60
+
+    messages = []
+    reports = []
+    for _ in range(count):
+        created_at = PERIOD_START + timedelta(seconds=rng.random() * span)
+        user_id = rng.choices(users, user_weights)[0]
+        event_name = rng.choices(EVENT_NAMES, event_weights)[0]
+        points = max(0, int(rng.gauss(60, 35)))
+        embed = discord.Embed(title=REPORT_TITLE, description=f"<@{user_id}> `nick_{user_id % 10000}`")
+        embed.add_field(name="> Ведущий", value=f"<@{user_id}>")
+        embed.add_field(name="> Ивент", value=f"`{event_name}`")
+        embed.add_field(name="> Получено", value=f"`{points}` баллов")
+        message = FakeMessage(time_snowflake(created_at) + rng.randrange(4096), [embed])
+        messages.append(message)
+        reports.append((message, user_id, event_name))
+
+    entries = []
+    # Около 2% отчетов с исправленными баллами и столько же самостоятельных начислений
+    for message, user_id, event_name in rng.sample(reports, count // 50):
+        entries.append(_manual_entry(rng, user_id, event_name, message.created_at.astimezone(MOSCOW_TZ), message.id))
+    for _ in range(count // 50):
+        end_dt = PERIOD_START + timedelta(seconds=rng.random() * span)
+        entries.append(_manual_entry(rng, rng.choices(users, user_weights)[0], rng.choice(EVENT_NAMES), end_dt, None))
+    return messages, entries, users[0]
+
+
+def _manual_entry(rng, user_id, event_name, end_dt, original_message_id):
+    entry = {
+        "entry_id": f"{rng.getrandbits(64):016x}",
+        "user_id": user_id,
+        "points": rng.randint(1, 180),
+        "event_name": event_name,
+        "end_time_iso": end_dt.isoformat(),
+        "adder_id": 0,
+        "adder_name": "bench",
+    }
+    if original_message_id:
+        entry["original_message_id"] = original_message_id
+    return entry
+
+
+def make_bot(data_path, entries):
+    with open(os.path.join(data_path, 'manual_points.json'), 'w', encoding='utf-8') as f:
+        json.dump(entries, f, ensure_ascii=False)
+    with open(os.path.join(data_path, 'categories.json'), 'w', encoding='utf-8') as f:
+        json.dump(CATEGORIES, f, ensure_ascii=False)
+    os.environ['RAILWAY_VOLUME_MOUNT_PATH'] = data_path
+    return MyBot(command_prefix="!", intents=intents)
+
+
+async def measure(channel, coroutine_factory, trace_memory):
+    """Один прогон: время, пиковая память (если включен tracemalloc) и число страниц истории."""
+    pages_before = channel.pages
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    files = await coroutine_factory()
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    for file in files:
+        file.close()
+    return elapsed, peak, channel.pages - pages_before
+
+
+async def run_size(count, top_user, messages, entries, args):
+    data_path = tempfile.mkdtemp(prefix='bench_reports_')
+    try:
+        bot = make_bot(data_path, entries)
+        channel = FakeParseChannel(messages, page_latency=args.latency / 1000)
+        bot.get_channel = lambda channel_id: channel
+        cog = LogsCog(bot)
+        guild = channel.guild
+
+        def report(log_type, category_name):
+            async def run():
+                user_id = top_user if log_type == 'check' else None
+                events = await cog._get_events_in_range(guild, DATE_RANGE, log_type, user_id=user_id, category_name=category_name)
+                return await cog.generate_log_file(events, DATE_RANGE, log_type, category_name=category_name)
+            return run
+
+        async def all_reports():
+            files, _ = await cog.generate_makser_reports(guild, DATE_RANGE)
+            return files
+
+        scenarios = [(f"{log_type}{'/' + category if category and log_type == 'category' else ''}", report(log_type, category))
+                     for log_type, category in LOG_TYPES]
+        scenarios.append(("makser: все отчеты", all_reports))
+
+        for source in args.sources:
+            if source == 'index':
+                elapsed, peak, pages = await measure(channel, lambda: _sync(bot, channel), not args.no_memory)
+                _print_row(count, source, "синхронизация индекса", elapsed, peak, pages)
+            for name, factory in scenarios:
+                bot.report_cache.clear()
+                elapsed, _, pages = await measure(channel, factory, False)
+                peak = 0
+                if not args.no_memory:
+                    bot.report_cache.clear()
+                    _, peak, _ = await measure(channel, factory, True)
+                _print_row(count, source, name, elapsed, peak, pages)
+        bot.event_store.close()
+    finally:
+        shutil.rmtree(data_path, ignore_errors=True)
+
+
+async def _sync(bot, channel):
+    await bot.event_store.sync(channel)
+    bot.event_store.live = True
+    return []
+
+
+def _print_row(count, source, name, elapsed, peak, pages):
+    peak_text = f"{peak / 2**20:9.1f}" if peak else f"{'-':>9}"
+    print(f"{count:>8} | {source:<7} | {name:<24} | {elapsed * 1000:10.1f} | {peak_text} | {pages:>6}")
+
+
+async def run(args):
+    print(f"{'событий':>8} | {'чтение':<7} | {'сценарий':<24} | {'время, мс':>10} | {'пик, МиБ':>9} | {'страниц':>6}")
+    for count in args.count:
+        messages, entries, top_user = make_dataset(count)
+        await run_size(count, top_user, messages, entries, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--count', type=int, nargs='+', default=[1_000, 10_000, 100_000], help="объемы канала (сообщений с отчетами)")
+    parser.add_argument('-s', '--sources', nargs='+', choices=['history', 'index'], default=['history', 'index'],
+                        help="history — чтение истории канала при пустом индексе, index — из локального индекса")
+    parser.add_argument('--latency', type=float, default=0.0, help="задержка одного запроса истории, мс")
+    parser.add_argument('--no-memory', action='store_true', help="не замерять пиковую память (tracemalloc замедляет прогон)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
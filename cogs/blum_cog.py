@@ -1,26 +1,18 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
-import os
 from main import is_admin
 
 class BlumCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.data_path = getattr(self.bot, 'data_path', '.')
-        self.blum_file = os.path.join(self.data_path, 'blum_list.json')
+        self.config = bot.config_store
 
     def _load_blum_list(self):
-        try:
-            with open(self.blum_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        return self.config.editable_blum_list()
 
     def _save_blum_list(self, data):
-        with open(self.blum_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
+        self.config.save_blum_list(data)
 
     blum_group = app_commands.Group(name="blum", description="Команды для управления списком Blum")
 
@@ -28,10 +20,10 @@ class BlumCog(commands.Cog):
     @app_commands.guild_only()
     @is_admin()
     async def add_blum(self, interaction: discord.Interaction, пользователь: discord.User):
-        blum_list = self._load_blum_list()
-        if пользователь.id in blum_list:
+        if пользователь.id in self.config.blum_set():
             await interaction.response.send_message(f"Пользователь {пользователь.mention} уже в списке Blum.", ephemeral=True)
         else:
+            blum_list = self._load_blum_list()
             blum_list.append(пользователь.id)
             self._save_blum_list(blum_list)
             await interaction.response.send_message(f"Пользователь {пользователь.mention} успешно добавлен в список Blum.", ephemeral=True)
@@ -40,10 +32,10 @@ class BlumCog(commands.Cog):
     @app_commands.guild_only()
     @is_admin()
     async def remove_blum(self, interaction: discord.Interaction, пользователь: discord.User):
-        blum_list = self._load_blum_list()
-        if пользователь.id not in blum_list:
+        if пользователь.id not in self.config.blum_set():
             await interaction.response.send_message(f"Пользователь {пользователь.mention} не найден в списке Blum.", ephemeral=True)
         else:
+            blum_list = self._load_blum_list()
             blum_list.remove(пользователь.id)
             self._save_blum_list(blum_list)
             await interaction.response.send_message(f"Пользователь {пользователь.mention} успешно убран из списка Blum.", ephemeral=True)
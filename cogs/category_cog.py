@@ -1,26 +1,18 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
-import os
 from main import is_admin
 
 class CategoryCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.data_path = getattr(self.bot, 'data_path', '.')
-        self.categories_file = os.path.join(self.data_path, 'categories.json')
+        self.config = bot.config_store
 
     def _load_categories(self):
-        try:
-            with open(self.categories_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+        return self.config.editable_categories()
 
     def _save_categories(self, data):
-        with open(self.categories_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        self.config.save_categories(data)
 
     category_group = app_commands.Group(name="category", description="Команды для управления категориями ивентов")
 
@@ -47,12 +47,15 @@ class HelpCog(commands.Cog):
                 "`/point edit <пользователь>` - Изменить баллы за один из последних ивентов пользователя.\n"
                 "`/point remove` - Удалить вручную начисленные баллы.\n"
                 "`/point list` - Показать список вручную начисленных баллов.\n"
-                "`/clear [количество]` - Очищает сообщения в текущем канале."
+                "`/clear [количество]` - Очищает сообщения в текущем канале.\n"
+                "`/stats` - Статистика работы бота: задержки команд, чтение истории, запросы к API.\n"
+                "`/memtop [количество] [остановить]` - Места, где выделено больше всего памяти."
             ),
             inline=False
         )
         
-        embed.set_footer(text="Для команд с датами, после их вызова появится окно для ввода периода.")
+        embed.set_footer(text="Для команд с датами, после их вызова появится окно для ввода периода. "
+                              "Параметр «профиль» у команд отчетов прикладывает к ответу разбивку времени по этапам.")
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -0,0 +1,104 @@
+import discord
+from discord.ext import commands
+import os
+import asyncio
+import aiohttp
+from utils.report_parser import parse_report_embeds, parse_report_message
+
+# Пауза перед повтором прерванной синхронизации и ее предел, в секундах
+SYNC_RETRY_DELAY = 5
+SYNC_RETRY_MAX_DELAY = 300
+
+
+class IngestCog(commands.Cog):
+    """Следит за каналом парсинга и поддерживает локальный индекс отчетов в актуальном состоянии."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.store = bot.event_store
+        self.parse_channel_id = int(os.getenv("PARSE_CHANNEL_ID"))
+        self._sync_task = None
+
+    async def cog_unload(self):
+        if self._sync_task:
+            self._sync_task.cancel()
+
+    async def _sync_with_channel(self):
+        """Дочитывает историю канала (при первом запуске — целиком) и включает прием в реальном времени.
+
+        При повторной синхронизации дополнительно сверяются последние сутки истории: правки
+        и удаления отчетов, пока бот был отключен, иначе не попали бы в индекс.
+        """
+        channel = self.bot.get_channel(self.parse_channel_id)
+        if not channel:
+            print("Индекс отчетов: канал для парсинга не найден, индексация пропущена.")
+            return
+        delay = SYNC_RETRY_DELAY
+        while True:
+            try:
+                print("Индекс отчетов: синхронизация с каналом парсинга...")
+                resync = self.store.is_backfilled
+                await self.store.sync(channel)
+                if resync:
+                    await self.store.rescan_tail(channel)
+                self.store.live = True
+                print("Индекс отчетов: синхронизация завершена, отчеты принимаются в реальном времени.")
+                return
+            except (discord.DiscordServerError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Пройденные пакеты уже сохранены, повтор продолжит обход с последней отметки
+                print(f"Индекс отчетов: синхронизация прервана ({e}), повтор через {delay} с.")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, SYNC_RETRY_MAX_DELAY)
+            except discord.HTTPException as e:
+                # Ответы 4xx (нет доступа, канал удален) повтором не исправить
+                print(f"Индекс отчетов: синхронизация остановлена, Discord отклонил запрос ({e}).")
+                return
+            except Exception as e:
+                print(f"Индекс отчетов: ошибка синхронизации: {e}")
+                return
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # on_ready приходит и после переподключения с новой сессией:
+        # сообщения за время разрыва могли быть пропущены, поэтому дочитываем историю заново.
+        self.store.live = False
+        if self._sync_task and not self._sync_task.done():
+            return
+        self._sync_task = asyncio.create_task(self._sync_with_channel())
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.channel.id != self.parse_channel_id:
+            return
+        records = parse_report_message(message)
+        if records:
+            self.store.upsert_messages([(message.id, records)])
+        if self.store.live:
+            self.store.mark_seen(message.id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if payload.channel_id != self.parse_channel_id:
+            return
+        # Частичные обновления без эмбедов (например, закрепление) отчет не меняют
+        if 'embeds' not in payload.data:
+            return
+        embeds = [discord.Embed.from_dict(data) for data in payload.data['embeds']]
+        created_at = discord.utils.snowflake_time(payload.message_id)
+        records = parse_report_embeds(payload.message_id, created_at, embeds)
+        self.store.upsert_messages([(payload.message_id, records)])
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.channel_id != self.parse_channel_id:
+            return
+        self.store.delete_messages([payload.message_id])
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if payload.channel_id != self.parse_channel_id:
+            return
+        self.store.delete_messages(payload.message_ids)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(IngestCog(bot))
@@ -2,54 +2,54 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import os
-import io
 from datetime import datetime, timedelta
 import pytz
-import json
 import re
+import time
+from array import array
+from contextlib import nullcontext
+from operator import attrgetter
 from main import is_admin
+from utils.history import fetch_report_records
+from utils.log_output import LogWriter, send_log_files, upload_limit
+from utils.night_bonus import NightBonusEngine
+from utils.report_events import ReportEvent
+from utils import profiling
 
 # --- Вспомогательные классы для UI ---
 
 class DateRangeModal(discord.ui.Modal, title='Укажите диапазон дат'):
-    def __init__(self, category_name: str, log_type: str, user_id: int, cog_instance):
+    def __init__(self, category_name: str, log_type: str, user_id: int, cog_instance, profile: bool = False):
         super().__init__()
         self.category_name = category_name
         self.log_type = log_type
         self.user_id = user_id
         self.cog_instance = cog_instance
+        # Приложить к ответу поэтапный профиль построения отчета
+        self.profile = profile
 
     date_range_input = discord.ui.TextInput(
-        label="Дата или диапазон (ДД.ММ или ДД.ММ-ДД.ММ)",
-        placeholder="Пример: 21.09 или 21.09-22.09",
+        label="Дата: ДД.ММ, ДД.ММ.ГГГГ, ММ.ГГГГ или период",
+        placeholder="Пример: 21.09, 21.09.2025, 09.2025, 21.09-25.09, 25.12.2024-05.01.2025, 09.2025-11.2025",
         required=True
     )
 
     async def on_submit(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True, thinking=True)
+        with profiling.profiling() if self.profile else nullcontext() as profile:
+            await self._build_and_send(interaction)
+        if profile:
+            await interaction.followup.send(f"```\n{profile.format()}\n```", ephemeral=True)
+
+    async def _build_and_send(self, interaction: discord.Interaction):
+        is_all_reports = self.log_type == 'makser' and self.category_name == '__all_reports__'
+        status = 'ok'
+        started = time.perf_counter()
         try:
-            if self.log_type == 'makser' and self.category_name == '__all_reports__':
-                categories_to_process = ["__all__"]
-                categories_data = self.cog_instance._load_json(self.cog_instance.categories_file, {})
-                
-                user_categories = list(categories_data.keys())
-                categories_to_process.extend(user_categories)
-                
-                if "Other" not in user_categories:
-                    categories_to_process.append("Other")
-
-                generated_files = []
-                for category in categories_to_process:
-                    events = await self.cog_instance._get_events_in_range(
-                        interaction, self.date_range_input.value, self.log_type,
-                        user_id=None, category_name=category
-                    )
-                    if events:
-                        log_file = await self.cog_instance.generate_log_file(
-                            events, self.date_range_input.value, self.log_type, 
-                            category_name=category, use_mentions=False
-                        )
-                        generated_files.append(log_file)
+            if is_all_reports:
+                generated_files, reports_count = await self.cog_instance.generate_makser_reports(
+                    interaction.guild, self.date_range_input.value
+                )
 
                 if not generated_files:
                     await interaction.followup.send("За указанный период не найдено ивентов ни в одной из категорий.", ephemeral=True)
@@ -59,44 +59,54 @@ class DateRangeModal(discord.ui.Modal, title='Укажите диапазон д
                 log_channel = self.cog_instance.bot.get_channel(log_channel_id)
 
                 if log_channel:
-                    await log_channel.send(files=generated_files)
-                    await interaction.followup.send(f"Все {len(generated_files)} отчетов Makser успешно созданы и отправлены в канал {log_channel.mention}.", ephemeral=True)
+                    with profiling.stage("отправка в канал"):
+                        await send_log_files(log_channel, generated_files)
+                    await interaction.followup.send(f"Все {reports_count} отчетов Makser успешно созданы и отправлены в канал {log_channel.mention}.", ephemeral=True)
                 else:
                     await interaction.followup.send("Ошибка: Не удалось найти канал для логов.", ephemeral=True)
             
             else:
                 events = await self.cog_instance._get_events_in_range(
-                    interaction, self.date_range_input.value, self.log_type, 
+                    interaction.guild, self.date_range_input.value, self.log_type, 
                     user_id=self.user_id, category_name=self.category_name
                 )
                 if not events:
                     await interaction.followup.send("За указанный период не найдено ивентов.", ephemeral=True)
                     return
                 
-                log_file = await self.cog_instance.generate_log_file(
+                log_files = await self.cog_instance.generate_log_file(
                     events, self.date_range_input.value, self.log_type, 
-                    category_name=self.category_name
+                    category_name=self.category_name, guild=interaction.guild
                 )
                 
                 log_channel_id = int(os.getenv("LOG_CHANNEL_ID"))
                 log_channel = self.cog_instance.bot.get_channel(log_channel_id)
 
                 if log_channel:
-                    await log_channel.send(file=log_file)
+                    with profiling.stage("отправка в канал"):
+                        await send_log_files(log_channel, log_files)
                     user_mention = f" для <@{self.user_id}>" if self.user_id else ""
                     await interaction.followup.send(f"Лог{user_mention} успешно создан и отправлен в канал {log_channel.mention}.", ephemeral=True)
                 else:
                     await interaction.followup.send("Ошибка: Не удалось найти канал для логов.", ephemeral=True)
 
         except ValueError as e:
+            status = 'invalid'
             await interaction.followup.send(f"Ошибка: {e}", ephemeral=True)
         except Exception as e:
+            status = 'error'
             print(f"Критическая ошибка в модальном окне: {e}")
             await interaction.followup.send(f"Произошла непредвиденная ошибка при создании лога: {e}", ephemeral=True)
+        finally:
+            report_type = 'makser_all' if is_all_reports else self.log_type
+            metrics = self.cog_instance.bot.metrics
+            metrics.observe('report_duration_seconds', time.perf_counter() - started, report_type=report_type)
+            metrics.inc('reports_total', report_type=report_type, status=status)
 
 class MakserSelect(discord.ui.Select):
-    def __init__(self, cog_instance):
+    def __init__(self, cog_instance, profile: bool = False):
         self.cog = cog_instance
+        self.profile = profile
         options = []
         
         options.append(discord.SelectOption(
@@ -112,7 +122,7 @@ class MakserSelect(discord.ui.Select):
         ))
 
         try:
-            categories_data = self.cog._load_json(self.cog.categories_file, {})
+            categories_data = self.cog.bot.config_store.categories()
             categories = list(categories_data.keys())
             
             options.extend([discord.SelectOption(label=name, description=f"Отчет по категории '{name}' (формат с никами)") for name in categories])
@@ -133,123 +143,194 @@ class MakserSelect(discord.ui.Select):
 
     async def callback(self, interaction: discord.Interaction):
         category_name = self.values[0]
-        modal = DateRangeModal(category_name=category_name, log_type='makser', user_id=None, cog_instance=self.cog)
+        modal = DateRangeModal(category_name=category_name, log_type='makser', user_id=None, cog_instance=self.cog, profile=self.profile)
         await interaction.response.send_modal(modal)
 
 class MakserView(discord.ui.View):
-    def __init__(self, cog_instance):
+    def __init__(self, cog_instance, profile: bool = False):
         super().__init__(timeout=300)
-        self.add_item(MakserSelect(cog_instance))
+        self.add_item(MakserSelect(cog_instance, profile=profile))
 
 class LogsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.moscow_tz = pytz.timezone('Europe/Moscow')
         self.data_path = getattr(self.bot, 'data_path', '.')
-        self.categories_file = os.path.join(self.data_path, 'categories.json')
-        self.blum_file = os.path.join(self.data_path, 'blum_list.json')
-        self.points_file = os.path.join(self.data_path, 'manual_points.json')
-
-    def _load_json(self, filename, default_value):
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return default_value
+        self.config = bot.config_store
 
     def parse_date_range(self, date_str: str):
+        """Разбирает ДД.ММ, ДД.ММ.ГГГГ или ММ.ГГГГ (весь месяц), а также диапазоны из них через '-'.
+
+        Если год не указан, берется текущий; диапазон вида 25.12-05.01 начинается в прошлом году.
+        """
         current_year = datetime.now().year
-        def parse_date(d_str):
+        format_error = "Неверный формат даты: '{}'. Используйте ДД.ММ, ДД.ММ.ГГГГ или ММ.ГГГГ."
+
+        def parse_bound(d_str):
+            parts = d_str.strip().split('.')
             try:
-                dt_obj = datetime.strptime(f"{d_str.strip()}.{current_year}", '%d.%m.%Y')
-                return self.moscow_tz.localize(dt_obj)
+                numbers = [int(part) for part in parts]
+                if len(parts) == 2 and len(parts[1]) == 4:
+                    day, month, year, whole_month = 1, numbers[0], numbers[1], True
+                elif len(parts) == 2:
+                    day, month, year, whole_month = numbers[0], numbers[1], None, False
+                elif len(parts) == 3:
+                    day, month, year, whole_month = numbers[0], numbers[1], numbers[2], False
+                    if year < 100:
+                        year += 2000
+                else:
+                    raise ValueError
+                # Проверка дня и месяца (2000 — високосный год, чтобы 29.02 без года проходил проверку)
+                datetime(year or 2000, month, day)
             except ValueError:
-                raise ValueError(f"Неверный формат даты: '{d_str}'. Используйте ДД.ММ.")
+                raise ValueError(format_error.format(d_str.strip()))
+            return day, month, year, whole_month
+
+        def start_of(bound, year):
+            day, month, _, _ = bound
+            try:
+                return self.moscow_tz.localize(datetime(year, month, day))
+            except ValueError:
+                raise ValueError(f"Даты {day:02d}.{month:02d}.{year} не существует.")
+
+        def end_of(bound, year):
+            start = start_of(bound, year)
+            if not bound[3]:
+                return start + timedelta(days=1)
+            month, year = (1, year + 1) if start.month == 12 else (start.month + 1, year)
+            return self.moscow_tz.localize(datetime(year, month, 1))
 
         if '-' in date_str:
-            start_str, end_str = date_str.split('-')
-            start_date = parse_date(start_str)
-            end_date = parse_date(end_str) + timedelta(days=1)
+            bounds = date_str.split('-')
+            if len(bounds) != 2:
+                raise ValueError(format_error.format(date_str.strip()))
+            start_bound, end_bound = parse_bound(bounds[0]), parse_bound(bounds[1])
+            start_year, end_year = start_bound[2], end_bound[2]
+            in_order = (start_bound[1], start_bound[0]) <= (end_bound[1], end_bound[0])
+            if start_year is None and end_year is None:
+                end_year = current_year
+                start_year = current_year if in_order else current_year - 1
+            elif start_year is None:
+                start_year = end_year if in_order else end_year - 1
+            elif end_year is None:
+                end_year = start_year if in_order else start_year + 1
+            start_date = start_of(start_bound, start_year)
+            end_date = end_of(end_bound, end_year)
+            if end_date <= start_date:
+                raise ValueError("Конец периода раньше его начала.")
         else:
-            start_date = parse_date(date_str)
-            end_date = start_date + timedelta(days=1)
+            bound = parse_bound(date_str)
+            year = bound[2] or current_year
+            start_date = start_of(bound, year)
+            end_date = end_of(bound, year)
         return start_date, end_date
 
-    async def _get_events_in_range(self, interaction: discord.Interaction, date_range_str: str, log_type: str, user_id: int = None, category_name: str = None):
+    async def _load_report_records(self, channel, start_time, end_time, report_type=None):
+        """Возвращает отчеты за период: из локального индекса, а пока он строится — из истории канала по окнам."""
+        store = self.bot.event_store
+        if store.is_backfilled:
+            with profiling.stage("индекс: дочитывание канала"):
+                await store.refresh(channel)
+            with profiling.stage("индекс: выборка отчетов"):
+                return store.events_in_range(start_time.timestamp(), end_time.timestamp())
+        return await fetch_report_records(channel, start_time, end_time, metrics=self.bot.metrics, report_type=report_type)
+
+    async def _get_events_in_range(self, guild: discord.Guild, date_range_str: str, log_type: str, user_id: int = None, category_name: str = None):
+        events = await self._collect_events(guild, date_range_str, log_type, user_id=user_id)
+        if category_name and category_name != "__all__":
+            events = [e for e in events if e.category == category_name]
+        return events
+
+    async def _collect_events(self, guild: discord.Guild, date_range_str: str, log_type: str, user_id: int = None, cache_ttl: float = None):
+        """Собирает и категоризирует ивенты за период без фильтра по категории."""
         start_time, end_time = self.parse_date_range(date_range_str)
+        # Настройки читаются до обращения к кэшу: если файл изменился, кэш будет сброшен
+        category_lookup = self.config.category_lookup()
+        night_engine = self._night_bonus_engine() if log_type == 'night_log' else None
+
+        # Суммарные отчеты строятся по суточной сводке, когда индекс полностью заполнен.
+        # Обычные отчеты отличаются от лога категории только оформлением, поэтому делят один результат;
+        # ночной лог дополнительно фильтрует ивенты.
+        use_rollups = log_type in ('makser', 'eventstats') and user_id is None and self.bot.event_store.is_backfilled
+        kind = 'rollup' if use_rollups else 'night' if log_type == 'night_log' else 'events'
+        cache_key = (start_time.timestamp(), end_time.timestamp(), kind, user_id)
+        cached_events = self.bot.report_cache.get(cache_key)
+        if cached_events is not None:
+            profiling.count("кэш отчетов: попадание")
+            return cached_events
+        profiling.count("кэш отчетов: промах")
+        # Инвалидации, пришедшие во время сборки, не дадут сохранить устаревший результат
+        cache_generation = self.bot.report_cache.generation()
         
+        parse_channel_id = int(os.getenv("PARSE_CHANNEL_ID"))
+        channel = self.bot.get_channel(parse_channel_id)
+        if not channel:
+            raise ValueError("Не удалось найти канал для парсинга.")
+
+        if use_rollups:
+            with profiling.stage("индекс: дочитывание канала"):
+                await self.bot.event_store.refresh(channel)
+            with profiling.stage("индекс: суточная сводка"):
+                rollup_events = self._collect_rollups(start_time, end_time, category_lookup)
+            self.bot.report_cache.put(cache_key, start_time.timestamp(), end_time.timestamp(), rollup_events, ttl=cache_ttl, generation=cache_generation)
+            return rollup_events
+
         all_events = []
         
-        manual_points = self._load_json(self.points_file, [])
-        edited_message_ids = {entry['original_message_id'] for entry in manual_points if 'original_message_id' in entry}
+        points_store = self.bot.points_store
+        edited_message_ids = points_store.edited_message_ids()
         
         original_nick_cache = {}
         historical_nick_cache = {}
-        
-        parse_channel_id = int(os.getenv("PARSE_CHANNEL_ID"))
-        channel = self.bot.get_channel(parse_channel_id)
-        if not channel:
-            await interaction.followup.send("Ошибка: Не удалось найти канал для парсинга.", ephemeral=True)
-            return []
 
-        async for message in channel.history(limit=None, after=start_time, before=end_time):
-            if not message.embeds: continue
-            for embed in message.embeds:
-                if embed.title != "Отчет о проведенном ивенте": continue
-                
-                parsed_data = {'user_id': None, 'user_nick': 'N/A', 'points': 0, 'event_name': 'Без названия', 'timestamp_dt': message.created_at.astimezone(self.moscow_tz)}
-                if embed.description:
-                    match = re.search(r'<@(\d+)>', embed.description)
-                    if match:
-                        parsed_data['user_id'] = int(match.group(1))
-                        nick_part = embed.description[match.end():].strip()
-                        parsed_data['user_nick'] = nick_part.replace('`', '').strip() or 'N/A'
-                for field in embed.fields:
-                    clean_field_name = field.name.lower().replace('>', '').strip()
-                    if clean_field_name == 'получено':
-                        try: parsed_data['points'] = int(re.search(r'\d+', field.value).group())
-                        except: continue
-                    elif clean_field_name == 'ивент':
-                        parsed_data['event_name'] = field.value.replace('`', '').strip()
-                
-                if parsed_data['user_id']:
-                    original_nick_cache[message.id] = parsed_data['user_nick']
-                    if parsed_data['user_id'] not in historical_nick_cache:
-                        historical_nick_cache[parsed_data['user_id']] = parsed_data['user_nick']
-
-                if message.id not in edited_message_ids:
-                    # --- ИЗМЕНЕНИЕ: Проверка на > 0 баллов остаётся ---
-                    if parsed_data['points'] > 0 and parsed_data['user_id'] is not None:
-                        all_events.append(parsed_data)
-
-        manual_entries_in_range = [e for e in manual_points if start_time <= datetime.fromisoformat(e['end_time_iso']) < end_time]
-        users_needing_full_search = {
-            e['user_id'] for e in manual_entries_in_range 
-            if not e.get('original_message_id') and e['user_id'] not in historical_nick_cache
+        records = await self._load_report_records(channel, start_time, end_time, report_type=log_type)
+        profiling.count("отчетов за период", len(records))
+        build_started = time.perf_counter()
+        for record in records:
+            original_nick_cache[record.message_id] = record.user_nick
+            if record.user_id not in historical_nick_cache:
+                historical_nick_cache[record.user_id] = record.user_nick
+
+            if record.message_id not in edited_message_ids:
+                # --- ИЗМЕНЕНИЕ: Проверка на > 0 баллов остаётся ---
+                if record.points > 0:
+                    all_events.append(ReportEvent(
+                        record.user_id, record.user_nick, record.points, record.event_name, record.created_at
+                    ))
+
+        manual_entries_in_range = points_store.in_range(start_time.timestamp(), end_time.timestamp())
+        profiling.add_stage("сборка ивентов", time.perf_counter() - build_started)
+        profiling.count("ручных записей за период", len(manual_entries_in_range))
+        nicks_started = time.perf_counter()
+        # Ники для ручных записей, которых нет среди отчетов за период, берутся из локального индекса
+        store = self.bot.event_store
+        missing_message_ids = {
+            e['original_message_id'] for e in manual_entries_in_range
+            if e.get('original_message_id') and e['original_message_id'] not in original_nick_cache
+        }
+        if missing_message_ids:
+            original_nick_cache.update(store.nicks_for_messages(missing_message_ids))
+        users_without_nick = {
+            e['user_id'] for e in manual_entries_in_range
+            if e.get('original_message_id') not in original_nick_cache and e['user_id'] not in historical_nick_cache
         }
+        if users_without_nick:
+            historical_nick_cache.update(store.latest_nicks(users_without_nick))
+        profiling.add_stage("ники из индекса", time.perf_counter() - nicks_started)
+
+        # --- ИЗМЕНЕНИЕ: Исключаем ручные записи с 0 или менее баллов ---
+        manual_entries_in_range = [e for e in manual_entries_in_range if e.get('points', 0) > 0]
+        users_needing_member = {
+            e['user_id'] for e in manual_entries_in_range
+            if e.get('original_message_id') not in original_nick_cache and e['user_id'] not in historical_nick_cache
+        }
+        member_names = {}
+        if users_needing_member:
+            profiling.count("участников без ника", len(users_needing_member))
+            with profiling.stage("участники сервера"):
+                member_names = await self.bot.member_resolver.resolve(guild, users_needing_member)
 
-        if users_needing_full_search:
-            async for message in channel.history(limit=None): 
-                if not users_needing_full_search: break
-                if not message.embeds: continue
-                for embed in message.embeds:
-                    if embed.title != "Отчет о проведенном ивенте": continue
-                    if embed.description:
-                        match = re.search(r'<@(\d+)>', embed.description)
-                        if match:
-                            uid = int(match.group(1))
-                            if uid in users_needing_full_search:
-                                nick_part = embed.description[match.end():].strip()
-                                user_nick = nick_part.replace('`', '').strip() or 'N/A'
-                                historical_nick_cache[uid] = user_nick
-                                users_needing_full_search.remove(uid)
-
-        current_nick_cache = {}
         for entry in manual_entries_in_range:
-            # --- ИЗМЕНЕНИЕ: Исключаем ручные записи с 0 или менее баллов ---
-            if entry.get('points', 0) <= 0:
-                continue
-
             user_nick = 'N/A'
             original_message_id = entry.get('original_message_id')
             uid = entry['user_id']
@@ -259,50 +340,116 @@ class LogsCog(commands.Cog):
             elif uid in historical_nick_cache:
                 user_nick = historical_nick_cache[uid]
             else:
-                if uid not in current_nick_cache:
-                    try:
-                        member = await interaction.guild.fetch_member(uid)
-                        current_nick_cache[uid] = member.display_name if member else f"ID {uid}"
-                    except discord.NotFound:
-                        current_nick_cache[uid] = f"ID {uid}"
-                user_nick = current_nick_cache[uid]
+                user_nick = member_names[uid]
             
-            all_events.append({
-                'user_id': uid, 'user_nick': user_nick, 'points': entry['points'],
-                'event_name': entry['event_name'], 'timestamp_dt': datetime.fromisoformat(entry['end_time_iso'])
-            })
+            all_events.append(ReportEvent(
+                uid, user_nick, entry['points'], entry['event_name'], points_store.end_ts(entry['entry_id'])
+            ))
         
         filtered_events = all_events
+        filter_started = time.perf_counter()
         if log_type == 'night_log':
-            night_events = []
-            for event in filtered_events:
-                if event['points'] <= 0: continue
-                end_time_event = event['timestamp_dt']
-                start_time_event = end_time_event - timedelta(minutes=event['points'])
-                night_start_boundary = end_time_event.replace(hour=2, minute=0, second=0, microsecond=0)
-                night_end_boundary = end_time_event.replace(hour=8, minute=0, second=0, microsecond=0)
-                if start_time_event < night_end_boundary and end_time_event > night_start_boundary:
-                    night_events.append(event)
-            filtered_events = night_events
+            # В ночной лог попадают ивенты, пересекающиеся хотя бы с одним ночным окном любой группы
+            positive_events = [e for e in filtered_events if e.points > 0]
+            starts, ends = self._event_intervals(positive_events)
+            night_mask = night_engine.night_mask(starts, ends)
+            filtered_events = [e for e, is_night in zip(positive_events, night_mask) if is_night]
 
         if user_id:
-            filtered_events = [e for e in filtered_events if e['user_id'] == user_id]
+            filtered_events = [e for e in filtered_events if e.user_id == user_id]
         
-        categories = self._load_json(self.categories_file, {})
+        # Названия ивентов повторяются, поэтому категория ищется один раз на название
+        categories_by_name = {}
         for event in filtered_events:
-            event['category'] = 'Other'
-            for cat, event_list in categories.items():
-                if event['event_name'].lower() in [ev.lower() for ev in event_list]:
-                    event['category'] = cat
-                    break
-        
-        if category_name and category_name != "__all__":
-             filtered_events = [e for e in filtered_events if e['category'] == category_name]
+            category = categories_by_name.get(event.event_name)
+            if category is None:
+                category = categories_by_name[event.event_name] = category_lookup.get(event.event_name.casefold(), 'Other')
+            event.category = category
+
+        filtered_events.sort(key=attrgetter('timestamp'))
+        profiling.add_stage("фильтры, категории, сортировка", time.perf_counter() - filter_started)
+        self.bot.report_cache.put(cache_key, start_time.timestamp(), end_time.timestamp(), filtered_events, ttl=cache_ttl, generation=cache_generation)
+        return filtered_events
+
+    def _collect_rollups(self, start_time, end_time, category_lookup):
+        """Суммы баллов и количества ивентов по (пользователь, ивент) за период с учетом ручных записей."""
+        store = self.bot.event_store
+        points_store = self.bot.points_store
+        start_ts, end_ts = start_time.timestamp(), end_time.timestamp()
+
+        totals = {}
+        for uid, event_name, count, points in store.rollup_in_range(start_time.date().isoformat(), end_time.date().isoformat()):
+            totals[(uid, event_name)] = [count, points]
+
+        # Отчеты, баллы за которые переопределены вручную, уже посчитаны в сводке — вычитаем их
+        for record in store.events_for_messages(points_store.edited_message_ids(), start_ts, end_ts):
+            if record.points > 0:
+                # Строки сводки может не оказаться (например, база еще не пересчитана) — отчет от этого не падает
+                total = totals.setdefault((record.user_id, record.event_name), [0, 0])
+                total[0] -= 1
+                total[1] -= record.points
+
+        for entry in points_store.in_range(start_ts, end_ts):
+            if entry.get('points', 0) > 0:
+                total = totals.setdefault((entry['user_id'], entry['event_name']), [0, 0])
+                total[0] += 1
+                total[1] += entry['points']
+
+        return [
+            ReportEvent(
+                uid, None, points, event_name, None, count=count,
+                category=category_lookup.get(event_name.casefold(), 'Other')
+            )
+            for (uid, event_name), (count, points) in totals.items() if count > 0
+        ]
+
+    def _night_bonus_engine(self):
+        return NightBonusEngine(self.config.night_bonus(), {'blum': self.config.blum_set()})
+
+    @staticmethod
+    def _event_intervals(events):
+        """Столбцы начала и конца ивентов в секундах эпохи: ивент длится столько минут, сколько за него баллов."""
+        ends = array('d', (e.timestamp for e in events))
+        starts = array('d', (e.timestamp - e.points * 60 for e in events))
+        return starts, ends
+
+    async def generate_makser_reports(self, guild: discord.Guild, date_range_str: str, cache_ttl: float = None, max_bytes: int = None):
+        """Все отчеты Makser за период: общий, по каждой категории и 'Other'. Возвращает (вложения, число отчетов).
+
+        max_bytes передается в generate_log_file.
+        """
+        categories_to_process = ["__all__"]
+        user_categories = list(self.config.categories().keys())
+        categories_to_process.extend(user_categories)
+        if "Other" not in user_categories:
+            categories_to_process.append("Other")
+
+        # История за период читается один раз, а затем ивенты раскладываются по категориям в памяти
+        all_events = await self._collect_events(guild, date_range_str, 'makser', cache_ttl=cache_ttl)
+        events_by_category = {}
+        for event in all_events:
+            events_by_category.setdefault(event.category, []).append(event)
+
+        generated_files = []
+        reports_count = 0
+        for category in categories_to_process:
+            events = all_events if category == "__all__" else events_by_category.get(category, [])
+            if events:
+                log_files = await self.generate_log_file(
+                    events, date_range_str, 'makser',
+                    category_name=category, use_mentions=False, guild=guild, max_bytes=max_bytes
+                )
+                generated_files.extend(log_files)
+                reports_count += 1
+        return generated_files, reports_count
 
-        return sorted(filtered_events, key=lambda x: x['timestamp_dt'])
+    async def generate_log_file(self, events: list, date_range_str: str, log_type: str, category_name: str = None, use_mentions: bool = True, guild: discord.Guild = None, max_bytes: int = None):
+        """Записывает лог построчно во временный файл и возвращает список вложений, каждое в пределах лимита загрузки сервера.
 
-    async def generate_log_file(self, events: list, date_range_str: str, log_type: str, category_name: str = None, use_mentions: bool = True):
-        buffer = io.StringIO()
+        max_bytes заменяет лимит сервера; 0 — без ограничения (один несжатый файл, например для записи на диск).
+        """
+        started = time.perf_counter()
+        buffer = LogWriter()
         total_points = 0
         if log_type == 'makser':
             if category_name == "__all__":
@@ -312,8 +459,8 @@ class LogsCog(commands.Cog):
                 
             user_points = {}
             for event in events:
-                user_id = event['user_id']
-                points = event['points']
+                user_id = event.user_id
+                points = event.points
                 total_points += points
                 user_points[user_id] = user_points.get(user_id, 0) + points
             
@@ -329,12 +476,12 @@ class LogsCog(commands.Cog):
             
             event_stats = {}
             for event in events:
-                name = event['event_name']
-                points = event['points']
-                category = event['category']
+                name = event.event_name
+                points = event.points
+                category = event.category
                 if name not in event_stats:
                     event_stats[name] = {'count': 0, 'points': 0, 'category': category}
-                event_stats[name]['count'] += 1
+                event_stats[name]['count'] += event.count
                 event_stats[name]['points'] += points
 
             stats_by_category = {}
@@ -352,47 +499,30 @@ class LogsCog(commands.Cog):
                     buffer.write(f"{event_data['name']} | {event_data['count']} | {event_data['points']}\n")
                 buffer.write("\n")
         else:
-            blum_list = self._load_json(self.blum_file, [])
-            for event in events:
-                if event['points'] <= 0: continue
-                end_time = event['timestamp_dt']
-                start_time = end_time - timedelta(minutes=event['points'])
-                line = f"{start_time.strftime('%H:%M %d.%m.%Y')} | {end_time.strftime('%H:%M %d.%m.%Y')} | <@{event['user_id']}> | {event['user_nick']} | "
-                current_points = event['points']
+            events = [e for e in events if e.points > 0]
+            if log_type == 'night_log':
+                starts, ends = self._event_intervals(events)
+                multipliers, bonus_minutes, bonus_points = self._night_bonus_engine().bonuses(
+                    [e.user_id for e in events], starts, ends
+                )
+            for i, event in enumerate(events):
+                end_time = event.end_time(self.moscow_tz)
+                start_time = end_time - timedelta(minutes=event.points)
+                line = f"{start_time.strftime('%H:%M %d.%m.%Y')} | {end_time.strftime('%H:%M %d.%m.%Y')} | <@{event.user_id}> | {event.user_nick} | "
+                current_points = event.points
                 night_bonus_info = ""
 
-                if log_type == 'night_log':
-                    is_blum = event['user_id'] in blum_list
-                    
-                    if is_blum:
-                        night_start = end_time.replace(hour=2, minute=0, second=0, microsecond=0)
-                        night_end = end_time.replace(hour=8, minute=0, second=0, microsecond=0)
-                        multiplier = 2.0
-                    else:
-                        night_start = end_time.replace(hour=3, minute=0, second=0, microsecond=0)
-                        night_end = end_time.replace(hour=7, minute=0, second=0, microsecond=0)
-                        multiplier = 1.5
-
-                    actual_start = max(start_time, night_start)
-                    actual_end = min(end_time, night_end)
-                    bonus_minutes = 0
-                    if actual_end > actual_start:
-                        bonus_minutes = round((actual_end - actual_start).total_seconds() / 60)
-                    
-                    if bonus_minutes > 0:
-                        bonus_points = round(bonus_minutes * (multiplier - 1.0))
-                        night_bonus_info = f"({multiplier}x) +{bonus_points} | "
-                        total_points += bonus_points
+                if log_type == 'night_log' and bonus_minutes[i] > 0:
+                    night_bonus_info = f"({multipliers[i]}x) +{bonus_points[i]} | "
+                    total_points += bonus_points[i]
                 
-                line += f"{current_points} | {night_bonus_info}{event['event_name']} | {event.get('category', 'Other')}\n"
+                line += f"{current_points} | {night_bonus_info}{event.event_name} | {event.category}\n"
                 buffer.write(line)
                 total_points += current_points
         
         if log_type != 'eventstats':
             buffer.write(f"\nИтог: {total_points} баллов")
 
-        buffer.seek(0)
-        
         # --- ИСПРАВЛЕНИЕ: Безопасная генерация имени файла ---
         safe_date_range = re.sub(r'[<>:"/\\|?*]', '_', date_range_str)
         if log_type == 'makser':
@@ -401,51 +531,59 @@ class LogsCog(commands.Cog):
         else:
             filename = f"log_{log_type}_{safe_date_range}.txt"
 
-        return discord.File(buffer, filename=filename)
+        files = buffer.to_discord_files(filename, upload_limit(guild) if max_bytes is None else max_bytes)
+        profiling.add_stage("файл лога", time.perf_counter() - started)
+        return files
 
     # --- Команды ---
     @app_commands.command(name="logs", description="Общий лог за дату или период.")
+    @app_commands.describe(профиль="Приложить к ответу поэтапный профиль построения отчета")
     @app_commands.guild_only()
-    async def logs(self, interaction: discord.Interaction):
-        modal = DateRangeModal(category_name=None, log_type='general', user_id=None, cog_instance=self)
+    async def logs(self, interaction: discord.Interaction, профиль: bool = False):
+        modal = DateRangeModal(category_name=None, log_type='general', user_id=None, cog_instance=self, profile=профиль)
         await interaction.response.send_modal(modal)
 
     @app_commands.command(name="log", description="Лог категории за дату или период.")
+    @app_commands.describe(профиль="Приложить к ответу поэтапный профиль построения отчета")
     @app_commands.guild_only()
-    async def log(self, interaction: discord.Interaction, категория: str):
-        categories = self._load_json(self.categories_file, {})
+    async def log(self, interaction: discord.Interaction, категория: str, профиль: bool = False):
+        categories = self.config.categories()
         if категория not in categories and категория != 'Other':
             await interaction.response.send_message(f"Ошибка: Категория '{категория}' не найдена.", ephemeral=True)
             return
-        modal = DateRangeModal(category_name=категория, log_type='category', user_id=None, cog_instance=self)
+        modal = DateRangeModal(category_name=категория, log_type='category', user_id=None, cog_instance=self, profile=профиль)
         await interaction.response.send_modal(modal)
 
     @app_commands.command(name="night_log", description="Лог ночной активности за период.")
+    @app_commands.describe(профиль="Приложить к ответу поэтапный профиль построения отчета")
     @app_commands.guild_only()
-    async def night_log(self, interaction: discord.Interaction):
-        modal = DateRangeModal(category_name=None, log_type='night_log', user_id=None, cog_instance=self)
+    async def night_log(self, interaction: discord.Interaction, профиль: bool = False):
+        modal = DateRangeModal(category_name=None, log_type='night_log', user_id=None, cog_instance=self, profile=профиль)
         await interaction.response.send_modal(modal)
 
     @app_commands.command(name="check", description="Лог активности человека за дату или период.")
+    @app_commands.describe(профиль="Приложить к ответу поэтапный профиль построения отчета")
     @app_commands.guild_only()
-    async def check(self, interaction: discord.Interaction, пользователь: discord.User):
-        modal = DateRangeModal(category_name=None, log_type='check', user_id=пользователь.id, cog_instance=self)
+    async def check(self, interaction: discord.Interaction, пользователь: discord.User, профиль: bool = False):
+        modal = DateRangeModal(category_name=None, log_type='check', user_id=пользователь.id, cog_instance=self, profile=профиль)
         await interaction.response.send_modal(modal)
     
     @app_commands.command(name="makser", description="Показывает панель для создания суммарного отчета по категориям.")
+    @app_commands.describe(профиль="Приложить к ответу поэтапный профиль построения отчета")
     @app_commands.guild_only()
-    async def makser(self, interaction: discord.Interaction):
+    async def makser(self, interaction: discord.Interaction, профиль: bool = False):
         try:
-            view = MakserView(self)
+            view = MakserView(self, profile=профиль)
             await interaction.response.send_message("Выберите тип отчета для создания:", view=view, ephemeral=True)
         except Exception as e:
             print(f"Критическая ошибка при создании вида для команды /makser: {e}")
             await interaction.response.send_message("Произошла ошибка при отображении панели.", ephemeral=True)
 
     @app_commands.command(name="eventstats", description="Статистика по ивентам за период.")
+    @app_commands.describe(профиль="Приложить к ответу поэтапный профиль построения отчета")
     @app_commands.guild_only()
-    async def eventstats(self, interaction: discord.Interaction):
-        modal = DateRangeModal(category_name=None, log_type='eventstats', user_id=None, cog_instance=self)
+    async def eventstats(self, interaction: discord.Interaction, профиль: bool = False):
+        modal = DateRangeModal(category_name=None, log_type='eventstats', user_id=None, cog_instance=self, profile=профиль)
         await interaction.response.send_modal(modal)
 
     @app_commands.command(name="clear", description="Очищает историю текущего канала (только для администраторов).")
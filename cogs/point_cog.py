@@ -1,13 +1,12 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
 import os
 import uuid
 from datetime import datetime
 import pytz
-import re
 from main import is_admin
+from utils.report_parser import parse_report_message
 
 class PointAddModal(discord.ui.Modal, title='Начисление баллов'):
     def __init__(self, cog_instance):
@@ -36,6 +35,8 @@ class PointAddModal(discord.ui.Modal, title='Начисление баллов')
     )
 
     async def on_submit(self, interaction: discord.Interaction):
+        # Запись в журнал ждет fsync — отвечаем сразу, результат придет через followup
+        await interaction.response.defer(ephemeral=True, thinking=True)
         try:
             # Валидация данных
             uid = int(self.user_id.value)
@@ -56,8 +57,8 @@ class PointAddModal(discord.ui.Modal, title='Начисление баллов')
                 "adder_name": interaction.user.display_name
             }
 
-            self.cog.add_point_entry(entry)
-            await interaction.response.send_message(
+            await self.cog.add_point_entry(entry)
+            await interaction.followup.send(
                 f"Баллы успешно начислены пользователю <@{uid}>.\n"
                 f"**Ивент:** {self.event_name.value}\n"
                 f"**Баллы:** {pts}\n"
@@ -65,9 +66,9 @@ class PointAddModal(discord.ui.Modal, title='Начисление баллов')
                 ephemeral=True
             )
         except ValueError:
-            await interaction.response.send_message("Ошибка: ID и баллы должны быть числами, а время в формате ЧЧ:ММ ДД.ММ.", ephemeral=True)
+            await interaction.followup.send("Ошибка: ID и баллы должны быть числами, а время в формате ЧЧ:ММ ДД.ММ.", ephemeral=True)
         except Exception as e:
-            await interaction.response.send_message(f"Произошла непредвиденная ошибка: {e}", ephemeral=True)
+            await interaction.followup.send(f"Произошла непредвиденная ошибка: {e}", ephemeral=True)
 
 class PointRemoveSelect(discord.ui.Select):
     def __init__(self, cog_instance, entries):
@@ -94,8 +95,9 @@ class PointRemoveSelect(discord.ui.Select):
 
     async def callback(self, interaction: discord.Interaction):
         entry_id = self.values[0]
-        self.cog.remove_point_entry(entry_id)
-        await interaction.response.send_message(f"Запись с ID `{entry_id}` была успешно удалена.", ephemeral=True)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        await self.cog.remove_point_entry(entry_id)
+        await interaction.followup.send(f"Запись с ID `{entry_id}` была успешно удалена.", ephemeral=True)
         # Отключаем select после использования
         self.disabled = True
         await interaction.message.edit(view=self.view)
@@ -121,55 +123,48 @@ class PointEditModal(discord.ui.Modal, title='Изменить баллы за 
         self.add_item(self.points_input)
 
     async def on_submit(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True, thinking=True)
         try:
             new_points = int(self.points_input.value)
             event_id = self.event_data['id']
             
-            data = self.cog._load_points()
+            store = self.cog.bot.points_store
 
             if event_id.startswith('manual_'):
                 entry_id = event_id.split('_', 1)[1]
-                for entry in data:
-                    if entry.get('entry_id') == entry_id:
-                        entry['points'] = new_points
-                        entry['editor_id'] = interaction.user.id
-                        entry['editor_name'] = interaction.user.display_name
-                        break
-                self.cog._save_points(data)
-                await interaction.response.send_message(f"Баллы для записи `{entry_id}` успешно изменены на {new_points}.", ephemeral=True)
+                await store.update(
+                    entry_id, points=new_points,
+                    editor_id=interaction.user.id, editor_name=interaction.user.display_name
+                )
+                await interaction.followup.send(f"Баллы для записи `{entry_id}` успешно изменены на {new_points}.", ephemeral=True)
 
             elif event_id.startswith('parsed_'):
                 message_id = int(event_id.split('_', 1)[1])
-                existing_entry = next((e for e in data if e.get('original_message_id') == message_id), None)
-
-                if existing_entry:
-                    existing_entry['points'] = new_points
-                    existing_entry['editor_id'] = interaction.user.id
-                    existing_entry['editor_name'] = interaction.user.display_name
-                else:
-                    new_entry = {
-                        "entry_id": str(uuid.uuid4()),
-                        "user_id": self.event_data['user_id'],
-                        "points": new_points,
-                        "event_name": self.event_data['event_name'], # <--- ИЗМЕНЕНИЕ ЗДЕСЬ
-                        "end_time_iso": self.event_data['timestamp_dt'].isoformat(),
-                        "adder_id": interaction.user.id,
-                        "adder_name": interaction.user.display_name,
-                        "original_message_id": message_id
-                    }
-                    data.append(new_entry)
-
-                self.cog._save_points(data)
-                await interaction.response.send_message(f"Баллы для ивента '{self.event_data['event_name']}' изменены на {new_points}. Создана/обновлена ручная запись.", ephemeral=True)
+                new_entry = {
+                    "entry_id": str(uuid.uuid4()),
+                    "user_id": self.event_data['user_id'],
+                    "points": new_points,
+                    "event_name": self.event_data['event_name'], # <--- ИЗМЕНЕНИЕ ЗДЕСЬ
+                    "end_time_iso": self.event_data['timestamp_dt'].isoformat(),
+                    "adder_id": interaction.user.id,
+                    "adder_name": interaction.user.display_name,
+                    "original_message_id": message_id
+                }
+                await store.set_override(
+                    new_entry, points=new_points,
+                    editor_id=interaction.user.id, editor_name=interaction.user.display_name
+                )
+
+                await interaction.followup.send(f"Баллы для ивента '{self.event_data['event_name']}' изменены на {new_points}. Создана/обновлена ручная запись.", ephemeral=True)
             
             for item in self.original_view.children:
                 item.disabled = True
             await interaction.message.edit(view=self.original_view)
 
         except ValueError:
-            await interaction.response.send_message("Ошибка: Баллы должны быть целым числом.", ephemeral=True)
+            await interaction.followup.send("Ошибка: Баллы должны быть целым числом.", ephemeral=True)
         except Exception as e:
-            await interaction.response.send_message(f"Произошла непредвиденная ошибка: {e}", ephemeral=True)
+            await interaction.followup.send(f"Произошла непредвиденная ошибка: {e}", ephemeral=True)
 
 class PointEditSelect(discord.ui.Select):
     def __init__(self, cog_instance, events):
@@ -215,32 +210,34 @@ class PointCog(commands.Cog, name="Points"):
     def __init__(self, bot):
         self.bot = bot
         self.data_path = getattr(self.bot, 'data_path', '.')
-        self.points_file = os.path.join(self.data_path, 'manual_points.json')
         self.moscow_tz = pytz.timezone('Europe/Moscow')
 
     def _load_points(self):
-        try:
-            with open(self.points_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
-
-    def _save_points(self, data):
-        with open(self.points_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        return self.bot.points_store.entries()
 
-    def add_point_entry(self, entry):
-        data = self._load_points()
-        data.append(entry)
-        self._save_points(data)
+    async def add_point_entry(self, entry):
+        await self.bot.points_store.add(entry)
         
-    def remove_point_entry(self, entry_id):
-        data = self._load_points()
-        data = [e for e in data if e.get('entry_id') != entry_id]
-        self._save_points(data)
+    async def remove_point_entry(self, entry_id):
+        await self.bot.points_store.remove(entry_id)
+
+    async def _load_user_report_records(self, channel, user_id: int, limit: int):
+        """Последние отчеты пользователя: из локального индекса, а пока он строится — из последних 500 сообщений."""
+        store = self.bot.event_store
+        if store.is_backfilled:
+            await store.refresh(channel)
+            return store.recent_events(user_id, limit)
+
+        records = []
+        scanned_messages = scanned_embeds = 0
+        async for message in channel.history(limit=500):
+            records.extend(record for record in parse_report_message(message) if record.user_id == user_id)
+            scanned_messages += 1
+            scanned_embeds += len(message.embeds)
+        self.bot.metrics.record_history_scan('point_edit', scanned_messages, scanned_embeds)
+        return records
 
     async def _get_user_recent_events(self, interaction: discord.Interaction, user_id: int, count: int = 10):
-        all_manual_points = self._load_points()
         user_manual_events = [
             {
                 'id': f"manual_{e['entry_id']}",
@@ -250,7 +247,7 @@ class PointCog(commands.Cog, name="Points"):
                 'timestamp_dt': datetime.fromisoformat(e['end_time_iso']),
                 'source': 'manual',
                 'original_message_id': e.get('original_message_id')
-            } for e in all_manual_points if e['user_id'] == user_id
+            } for e in self.bot.points_store.for_user(user_id)
         ]
         
         edited_message_ids = {e['original_message_id'] for e in user_manual_events if e['original_message_id']}
@@ -261,42 +258,20 @@ class PointCog(commands.Cog, name="Points"):
         if not channel:
             return []
 
-        async for message in channel.history(limit=500):
-            if message.id in edited_message_ids:
+        # Отредактированные отчеты отбрасываются, поэтому запрашиваем с запасом на их количество
+        records = await self._load_user_report_records(channel, user_id, count + len(edited_message_ids))
+        for record in records:
+            if record.message_id in edited_message_ids:
                 continue
-
-            if not message.embeds: continue
-            for embed in message.embeds:
-                if embed.title != "Отчет о проведенном ивенте": continue
-                
-                if embed.description:
-                    match = re.search(r'<@(\d+)>', embed.description)
-                    if not match or int(match.group(1)) != user_id:
-                        continue
-                else:
-                    continue
-
-                data = {
-                    'id': f"parsed_{message.id}",
-                    'user_id': user_id,
-                    'points': 0,
-                    'event_name': 'Без названия',
-                    'timestamp_dt': message.created_at.astimezone(self.moscow_tz),
-                    'source': 'parsed',
-                    'message_id': message.id
-                }
-
-                for field in embed.fields:
-                    clean_field_name = field.name.lower().replace('>', '').strip()
-                    if clean_field_name == 'получено':
-                        try:
-                            data['points'] = int(re.search(r'\d+', field.value).group())
-                        except:
-                            data['points'] = 0
-                    elif clean_field_name == 'ивент':
-                        data['event_name'] = field.value.replace('`', '').strip()
-                
-                user_parsed_events.append(data)
+            user_parsed_events.append({
+                'id': f"parsed_{record.message_id}",
+                'user_id': user_id,
+                'points': record.points,
+                'event_name': record.event_name,
+                'timestamp_dt': datetime.fromtimestamp(record.created_at, self.moscow_tz),
+                'source': 'parsed',
+                'message_id': record.message_id
+            })
         
         all_events = user_manual_events + user_parsed_events
         all_events.sort(key=lambda x: x['timestamp_dt'], reverse=True)
@@ -337,8 +312,7 @@ class PointCog(commands.Cog, name="Points"):
     @app_commands.guild_only()
     @is_admin()
     async def remove_points(self, interaction: discord.Interaction):
-        entries = self._load_points()
-        entries.sort(key=lambda x: x['end_time_iso'], reverse=True)
+        entries = self.bot.points_store.latest(25)
         view = PointRemoveView(self, entries)
         await interaction.response.send_message("Выберите запись для удаления (показаны последние 25):", view=view, ephemeral=True)
 
@@ -0,0 +1,90 @@
+import discord
+from discord.ext import commands, tasks
+import os
+import pytz
+from datetime import datetime, time, timedelta
+from utils.log_output import send_log_files
+
+MOSCOW_TZ = pytz.timezone('Europe/Moscow')
+# Время ежедневного расчета отчетов за прошедшие сутки (по Москве). tasks.loop подставляет tzinfo
+# без localize, а сама зона pytz дает исторический LMT+2:30, поэтому берется зона с текущим смещением.
+DAILY_REPORTS_TIME = time(hour=0, minute=10, tzinfo=MOSCOW_TZ.localize(datetime.now()).tzinfo)
+# Сколько секунд готовые ивенты за вчера хранятся в кэше отчетов — до конца рабочего дня
+DAILY_REPORTS_CACHE_TTL = 18 * 60 * 60
+
+
+class SchedulerCog(commands.Cog):
+    """Заранее, после полуночи по Москве, собирает отчеты за прошедшие сутки.
+
+    Ивенты за вчера попадают в кэш отчетов с увеличенным временем жизни, поэтому утренние
+    /night_log, /makser и /eventstats за вчера отвечают без повторного чтения истории.
+    Файлы отчетов строятся, только если задана переменная окружения DAILY_REPORTS_AUTOPOST:
+    тогда они сразу отправляются в канал логов.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.autopost = os.getenv("DAILY_REPORTS_AUTOPOST", "").lower() in ("1", "true", "yes", "on")
+
+    async def cog_load(self):
+        self.daily_reports.start()
+
+    async def cog_unload(self):
+        self.daily_reports.cancel()
+
+    @tasks.loop(time=DAILY_REPORTS_TIME)
+    async def daily_reports(self):
+        logs_cog = self.bot.get_cog('LogsCog')
+        log_channel = self.bot.get_channel(int(os.getenv("LOG_CHANNEL_ID")))
+        parse_channel = self.bot.get_channel(int(os.getenv("PARSE_CHANNEL_ID")))
+        if not logs_cog or not parse_channel:
+            print("Ежедневные отчеты: ког логов или канал для парсинга недоступны, расчет пропущен.")
+            return
+
+        yesterday = datetime.now(MOSCOW_TZ).date() - timedelta(days=1)
+        date_range_str = yesterday.strftime('%d.%m.%Y')
+        guild = parse_channel.guild
+        print(f"Ежедневные отчеты: расчет за {date_range_str}...")
+
+        if not self.autopost or not log_channel:
+            if self.autopost:
+                print("Ежедневные отчеты: канал логов недоступен, отчеты только сохраняются в кэше.")
+            try:
+                for log_type in ('night_log', 'eventstats', 'makser'):
+                    await logs_cog._collect_events(guild, date_range_str, log_type, cache_ttl=DAILY_REPORTS_CACHE_TTL)
+            except Exception as e:
+                print(f"Ежедневные отчеты: ошибка расчета за {date_range_str}: {e}")
+                return
+            print(f"Ежедневные отчеты за {date_range_str} подготовлены и сохранены в кэше.")
+            return
+
+        files = []
+        try:
+            for log_type in ('night_log', 'eventstats'):
+                events = await logs_cog._collect_events(guild, date_range_str, log_type, cache_ttl=DAILY_REPORTS_CACHE_TTL)
+                if events:
+                    files.extend(await logs_cog.generate_log_file(events, date_range_str, log_type, guild=guild))
+            makser_files, _ = await logs_cog.generate_makser_reports(guild, date_range_str, cache_ttl=DAILY_REPORTS_CACHE_TTL)
+            files.extend(makser_files)
+        except Exception as e:
+            print(f"Ежедневные отчеты: ошибка расчета за {date_range_str}: {e}")
+            for file in files:
+                file.close()
+            return
+
+        if not files:
+            print(f"Ежедневные отчеты: за {date_range_str} ивентов нет.")
+            return
+        try:
+            await send_log_files(log_channel, files)
+            print(f"Ежедневные отчеты за {date_range_str} отправлены в канал логов ({len(files)} файлов).")
+        except discord.HTTPException as e:
+            print(f"Ежедневные отчеты: не удалось отправить файлы: {e}")
+
+    @daily_reports.before_loop
+    async def before_daily_reports(self):
+        await self.bot.wait_until_ready()
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(SchedulerCog(bot))
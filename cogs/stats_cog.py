@@ -0,0 +1,228 @@
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+import asyncio
+import os
+import tracemalloc
+from main import is_admin
+
+# Как часто файл метрик перезаписывается, в секундах
+METRICS_FILE_INTERVAL = int(os.getenv("METRICS_FILE_INTERVAL", 60))
+# Глубина стека, запоминаемая tracemalloc для каждого выделения
+MEMTOP_TRACE_FRAMES = 5
+# Лимит длины сообщения Discord с запасом на оформление
+MESSAGE_LIMIT = 1900
+
+
+def _format_seconds(value):
+    return "∞" if value == float('inf') else f"{value:.2f} с"
+
+
+class StatsCog(commands.Cog):
+    """Метрики и диагностика: /stats, /memtop, файл metrics.prom и, если задан METRICS_PORT, HTTP-эндпоинт /metrics."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.metrics = bot.metrics
+        self.metrics_file = os.getenv("METRICS_FILE") or os.path.join(bot.data_path, 'metrics.prom')
+        self.metrics_port = os.getenv("METRICS_PORT")
+        self._runner = None
+        self._previous_snapshot = None
+
+    async def cog_load(self):
+        self.write_metrics_file.start()
+        if self.metrics_port:
+            await self._start_http_endpoint(int(self.metrics_port))
+
+    async def cog_unload(self):
+        self.write_metrics_file.cancel()
+        if self._runner:
+            await self._runner.cleanup()
+
+    # --- Выгрузка в формате Prometheus ---
+
+    @tasks.loop(seconds=METRICS_FILE_INTERVAL)
+    async def write_metrics_file(self):
+        tmp_file = self.metrics_file + '.tmp'
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(self.metrics.to_prometheus())
+            os.replace(tmp_file, self.metrics_file)
+        except OSError as e:
+            print(f"Не удалось записать файл метрик: {e}")
+
+    async def _start_http_endpoint(self, port):
+        # aiohttp устанавливается вместе с discord.py
+        from aiohttp import web
+
+        async def handle_metrics(request):
+            return web.Response(text=self.metrics.to_prometheus(), content_type='text/plain', charset='utf-8')
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle_metrics)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, '0.0.0.0', port).start()
+        print(f"Метрики доступны по адресу http://0.0.0.0:{port}/metrics")
+
+    # --- Команда /stats ---
+
+    def _latency_lines(self, metric_name, label, prefix=''):
+        histograms = self.metrics.histograms(metric_name)
+        rows = sorted(histograms.items(), key=lambda item: item[1].count, reverse=True)[:10]
+        lines = []
+        for labels, histogram in rows:
+            name = dict(labels).get(label, '?')
+            average = histogram.sum / histogram.count
+            lines.append(
+                f"`{prefix}{name}` — {histogram.count} шт., среднее {_format_seconds(average)}, "
+                f"p95 ≤ {_format_seconds(histogram.quantile(0.95))}"
+            )
+        return lines
+
+    def _build_stats_embed(self):
+        metrics = self.metrics
+        embed = discord.Embed(title="Статистика работы бота", color=discord.Color.blue())
+
+        commands_lines = self._latency_lines('command_duration_seconds', 'command', prefix='/')
+        embed.add_field(name="Команды", value="\n".join(commands_lines) or "Нет данных", inline=False)
+
+        report_lines = self._latency_lines('report_duration_seconds', 'report_type')
+        failed = sum(v for labels, v in metrics.counters('reports_total').items() if dict(labels).get('status') != 'ok')
+        if report_lines:
+            report_lines.append(f"Завершились ошибкой: {failed}")
+        embed.add_field(name="Отчеты", value="\n".join(report_lines) or "Нет данных", inline=False)
+
+        history_lines = []
+        for labels, messages in sorted(metrics.counters('history_messages_total').items()):
+            labels = dict(labels)
+            name = f"{labels['source']}: {labels['report_type']}" if 'report_type' in labels else labels['source']
+            embeds = metrics.counter('history_embeds_total', **labels)
+            pages = metrics.counter('history_pages_total', **labels)
+            history_lines.append(f"`{name}` — сообщений: {messages}, эмбедов: {embeds}, страниц: {pages}")
+        embed.add_field(name="Чтение истории канала", value="\n".join(history_lines) or "Нет данных", inline=False)
+
+        rest_requests = metrics.counters('rest_requests_total')
+        by_route = {}
+        for labels, value in rest_requests.items():
+            labels = dict(labels)
+            route = f"{labels['method']} {labels['route']}"
+            by_route[route] = by_route.get(route, 0) + value
+        top_routes = sorted(by_route.items(), key=lambda item: item[1], reverse=True)[:5]
+        rate_limit_hits = sum(metrics.counters('rate_limit_hits_total').values())
+        rest_lines = [f"Всего запросов: {sum(rest_requests.values())}"]
+        rest_lines += [f"`{route}` — {count}" for route, count in top_routes]
+        rest_lines.append(
+            f"Участники: fetch_member {metrics.counter('member_lookups_total', method='fetch_member')}, "
+            f"query_members {metrics.counter('member_lookups_total', method='query_members')}"
+        )
+        rest_lines.append(
+            f"Ответов 429: {rate_limit_hits}, ожидание: {metrics.counter('rate_limit_wait_seconds_total'):.1f} с, "
+            f"исчерпаний корзин: {metrics.counter('rate_limit_bucket_exhausted_total')}"
+        )
+        embed.add_field(name="REST API", value="\n".join(rest_lines), inline=False)
+
+        cache_values = {}
+        for name, labels, value in metrics.collected():
+            if name in ('cache_hits', 'cache_misses'):
+                cache_values.setdefault(labels['cache'], {})[name] = value
+        cache_lines = []
+        for cache_name, values in sorted(cache_values.items()):
+            hits, misses = values.get('cache_hits', 0), values.get('cache_misses', 0)
+            total = hits + misses
+            rate = f"{hits / total:.0%}" if total else "—"
+            cache_lines.append(f"`{cache_name}` — попаданий {hits} из {total} ({rate})")
+        embed.add_field(name="Кэши", value="\n".join(cache_lines) or "Нет данных", inline=False)
+
+        watchdog = self.bot.loop_watchdog
+        lag = metrics.histograms('loop_lag_seconds').get(())
+        loop_lines = [
+            f"Задержка p95 ≤ {_format_seconds(lag.quantile(0.95)) if lag else '—'}, максимум {watchdog.max_lag:.2f} с",
+            f"Блокировок дольше {watchdog.threshold:.2f} с: {watchdog.blocked_count}",
+        ]
+        if watchdog.last_block:
+            blocked_at, duration = watchdog.last_block
+            loop_lines.append(f"Последняя: <t:{int(blocked_at)}:R>, {duration:.2f} с")
+        embed.add_field(name="Цикл событий", value="\n".join(loop_lines), inline=False)
+
+        uptime_hours = (discord.utils.utcnow().timestamp() - metrics.started_at) / 3600
+        embed.set_footer(text=f"Время работы: {uptime_hours:.1f} ч. Полные метрики: {os.path.basename(self.metrics_file)}")
+        return embed
+
+    @app_commands.command(name="stats", description="Статистика работы бота: задержки, чтение истории, запросы к API.")
+    @app_commands.guild_only()
+    @is_admin()
+    async def stats(self, interaction: discord.Interaction):
+        await interaction.response.send_message(embed=self._build_stats_embed(), ephemeral=True)
+
+    # --- Команда /memtop ---
+
+    @staticmethod
+    def _take_snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    @staticmethod
+    def _short_path(filename):
+        for marker in ('site-packages' + os.sep, os.getcwd() + os.sep):
+            if marker in filename:
+                return filename.split(marker, 1)[1]
+        return filename
+
+    @app_commands.command(name="memtop", description="Места, где выделено больше всего памяти (tracemalloc).")
+    @app_commands.describe(
+        количество="Сколько строк показать",
+        остановить="Выключить трассировку памяти после снимка"
+    )
+    @app_commands.guild_only()
+    @is_admin()
+    async def memtop(self, interaction: discord.Interaction, количество: app_commands.Range[int, 1, 25] = 10, остановить: bool = False):
+        # Трассировку можно включить и при запуске через переменную окружения PYTHONTRACEMALLOC
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMTOP_TRACE_FRAMES)
+            self._previous_snapshot = None
+            await interaction.response.send_message(
+                "Трассировка памяти включена. Учитываются только выделения после этого момента — повторите команду позже.",
+                ephemeral=True
+            )
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        # Снимок большой кучи строится заметное время, поэтому не в потоке цикла событий
+        snapshot = await asyncio.to_thread(self._take_snapshot)
+        current, peak = tracemalloc.get_traced_memory()
+        if self._previous_snapshot is not None:
+            stats = await asyncio.to_thread(snapshot.compare_to, self._previous_snapshot, 'lineno')
+            title = "Рост памяти с прошлого снимка"
+        else:
+            stats = await asyncio.to_thread(snapshot.statistics, 'lineno')
+            title = "Крупнейшие выделения памяти"
+
+        lines = [f"{title}. Сейчас {current / 2**20:.1f} МиБ, пик {peak / 2**20:.1f} МиБ."]
+        for stat in stats[:количество]:
+            frame = stat.traceback[0]
+            growth = f" ({stat.size_diff / 1024:+.1f})" if self._previous_snapshot is not None else ""
+            lines.append(f"{stat.size / 1024:9.1f} КиБ{growth} {stat.count:>7} | {self._short_path(frame.filename)}:{frame.lineno}")
+
+        footer = ""
+        if остановить:
+            tracemalloc.stop()
+            self._previous_snapshot = None
+            footer = "Трассировка памяти выключена."
+        else:
+            self._previous_snapshot = snapshot
+
+        text = lines[0] + "\n```\n"
+        for line in lines[1:]:
+            if len(text) + len(line) > MESSAGE_LIMIT:
+                break
+            text += line + "\n"
+        await interaction.followup.send(text + "```" + footer, ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(StatsCog(bot))
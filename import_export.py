@@ -0,0 +1,222 @@
+"""Офлайн-работа с данными бота без подключения к Discord.
+
+Импорт экспорта канала парсинга (JSON из DiscordChatExporter — {"messages": [...]} — или список
+сообщений в формате Discord API) в локальный индекс отчетов events.db:
+    python import_export.py import export.json --complete
+
+Построение отчетов по индексу теми же функциями, что и в боте:
+    python import_export.py report general 21.09-25.09
+    python import_export.py report night_log 01.09.2025-30.09.2025 --out reports/
+    python import_export.py report makser 09.2025 --category Игры
+    python import_export.py report makser 09.2025 --all
+    python import_export.py report check 21.09 --user 123456789012345678
+
+Каталог данных берется из --data-path, иначе из RAILWAY_VOLUME_MOUNT_PATH, как у бота.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+
+from utils.offline_env import stub_bot_env
+
+# Каналы и роли в офлайн-режиме не используются, но их читают main.py и коги
+stub_bot_env()
+
+import discord
+from discord.utils import snowflake_time
+from utils.event_store import EventStore
+from utils.log_output import DEFAULT_UPLOAD_LIMIT
+from utils.report_parser import parse_report_embeds
+
+# Сколько сообщений записывается в индекс одной транзакцией
+IMPORT_BATCH_SIZE = 1000
+REPORT_TYPES = ('general', 'category', 'night_log', 'check', 'makser', 'eventstats')
+
+
+# --- Импорт ---
+
+def load_export(path):
+    """Читает сообщения экспорта: объект DiscordChatExporter или список сообщений Discord API."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('messages', [])
+    if not isinstance(data, list):
+        raise ValueError("Ожидался объект с ключом 'messages' или список сообщений.")
+    return data
+
+
+def _embed_from_export(data):
+    # Берутся только поля, которые читает разбор отчетов: форматы экспорта различаются остальным
+    return discord.Embed.from_dict({
+        'title': data.get('title'),
+        'description': data.get('description'),
+        'fields': [{'name': field.get('name', ''), 'value': field.get('value', '')} for field in data.get('fields') or []],
+    })
+
+
+def parse_export_message(message):
+    """Возвращает пару (message_id, records) для сообщения экспорта."""
+    message_id = int(message['id'])
+    embeds = [_embed_from_export(embed) for embed in message.get('embeds') or []]
+    return message_id, parse_report_embeds(message_id, snowflake_time(message_id), embeds)
+
+
+def import_export(store, messages, complete=False, batch_size=IMPORT_BATCH_SIZE):
+    """Записывает сообщения экспорта в индекс пакетами по batch_size в отдельных транзакциях.
+
+    С complete=True экспорт считается полной историей канала: отметка синхронизации сдвигается
+    на последнее сообщение, и бот после запуска дочитает только более новые сообщения.
+    """
+    imported = reports = 0
+    for i in range(0, len(messages), batch_size):
+        batch = [parse_export_message(message) for message in messages[i:i + batch_size]]
+        checkpoint = max(message_id for message_id, _ in batch) if complete else None
+        store.upsert_messages(batch, checkpoint=checkpoint)
+        imported += len(batch)
+        reports += sum(len(records) for _, records in batch)
+    if complete:
+        store.mark_backfilled()
+    return imported, reports
+
+
+def run_import(args):
+    started = time.perf_counter()
+    messages = load_export(args.export)
+    store = EventStore(os.path.join(args.data_path, 'events.db'))
+    try:
+        imported, reports = import_export(store, messages, complete=args.complete, batch_size=args.batch_size)
+    finally:
+        store.close()
+    print(f"Импортировано сообщений: {imported}, отчетов: {reports} за {time.perf_counter() - started:.1f} с.")
+    if not args.complete:
+        print("Индекс не отмечен как полный: для построения отчетов импортируйте полный экспорт с флагом --complete.")
+
+
+# --- Отчеты ---
+
+class NotFoundResponse:
+    """Ответ 404, каким Discord отвечает на запрос неизвестного участника."""
+    status = 404
+    reason = 'Not Found'
+
+
+def unknown_member_error():
+    return discord.NotFound(NotFoundResponse(), {'code': 10007, 'message': 'Unknown Member'})
+
+
+class OfflineGuild:
+    """Сервер без подключения: имена участников, которых нет в индексе, выводятся как "ID ..."."""
+    id = 0
+    filesize_limit = DEFAULT_UPLOAD_LIMIT
+
+    def get_member(self, user_id):
+        return None
+
+    async def query_members(self, user_ids=None, limit=5, cache=True):
+        return []
+
+    async def fetch_member(self, user_id):
+        raise unknown_member_error()
+
+
+class OfflineChannel:
+    """Канал парсинга без подключения: вся история уже в индексе."""
+    guild = OfflineGuild()
+
+    async def history(self, **kwargs):
+        return
+        yield
+
+
+async def build_report(args):
+    from main import MyBot, intents
+    from cogs.logs_cog import LogsCog
+
+    bot = MyBot(command_prefix="!", intents=intents)
+    try:
+        if not bot.event_store.is_backfilled:
+            raise ValueError("Индекс отчетов не заполнен. Импортируйте полный экспорт канала с флагом --complete.")
+        # Новых сообщений офлайн не будет — дочитывать канал не нужно
+        bot.event_store.live = True
+        channel = OfflineChannel()
+        bot.get_channel = lambda channel_id: channel
+        cog = LogsCog(bot)
+        guild = channel.guild
+
+        if args.all and args.type != 'makser':
+            raise ValueError("Флаг --all используется только с отчетом makser.")
+        if args.all:
+            # Отчеты пишутся на диск, поэтому лимит загрузки Discord к ним не применяется
+            files, _ = await cog.generate_makser_reports(guild, args.date_range, max_bytes=0)
+        else:
+            category_name = args.category
+            if args.type == 'makser' and not category_name:
+                category_name = '__all__'
+            if args.type == 'category' and not category_name:
+                raise ValueError("Для отчета category укажите --category.")
+            if args.type == 'check' and not args.user:
+                raise ValueError("Для отчета check укажите --user.")
+            events = await cog._get_events_in_range(
+                guild, args.date_range, args.type,
+                user_id=args.user if args.type == 'check' else None, category_name=category_name
+            )
+            if not events:
+                print("За указанный период не найдено ивентов.")
+                return []
+            files = await cog.generate_log_file(events, args.date_range, args.type, category_name=category_name, max_bytes=0)
+
+        os.makedirs(args.out, exist_ok=True)
+        written = []
+        for file in files:
+            path = os.path.join(args.out, file.filename)
+            with open(path, 'wb') as out:
+                shutil.copyfileobj(file.fp, out)
+            file.close()
+            written.append(path)
+        return written
+    finally:
+        bot.event_store.close()
+
+
+def run_report(args):
+    try:
+        written = asyncio.run(build_report(args))
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        raise SystemExit(1)
+    for path in written:
+        print(f"Сохранен отчет: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-path', default=os.environ.get('RAILWAY_VOLUME_MOUNT_PATH', '.'), help="каталог данных бота")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="импорт экспорта канала в индекс отчетов")
+    import_parser.add_argument('export', help="JSON-файл экспорта")
+    import_parser.add_argument('--complete', action='store_true', help="экспорт содержит всю историю канала")
+    import_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="сообщений в одной транзакции")
+    import_parser.set_defaults(handler=run_import)
+
+    report_parser = subparsers.add_parser('report', help="построение отчета по индексу")
+    report_parser.add_argument('type', choices=REPORT_TYPES, help="тип отчета")
+    report_parser.add_argument('date_range', help="дата или период, как в окне бота: 21.09, 21.09-22.09, 09.2025")
+    report_parser.add_argument('--category', help="категория для category и makser")
+    report_parser.add_argument('--user', type=int, help="id пользователя для check")
+    report_parser.add_argument('--all', action='store_true', help="все отчеты Makser: общий, по категориям и Other")
+    report_parser.add_argument('--out', default='.', help="каталог для файлов отчета")
+    report_parser.set_defaults(handler=run_report)
+
+    args = parser.parse_args()
+    # Бот читает каталог данных из окружения
+    os.environ['RAILWAY_VOLUME_MOUNT_PATH'] = args.data_path
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
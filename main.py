@@ -4,6 +4,13 @@ import os
 from dotenv import load_dotenv
 import asyncio
 from discord import app_commands
+from utils.event_store import EventStore
+from utils.member_resolver import MemberNameResolver
+from utils.config_store import ConfigStore
+from utils.points_store import PointsStore
+from utils.report_cache import ReportCache
+from utils.metrics import Metrics, install_discord_http_metrics
+from utils.loop_watchdog import LoopWatchdog
 
 # --- Загрузка переменных окружения ---
 load_dotenv()
@@ -11,12 +18,6 @@ load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 ADMIN_ROLE_ID = os.getenv('ADMIN_ROLE_ID')
 
-# Проверка наличия обязательных переменных
-if not all([TOKEN, os.getenv('PARSE_CHANNEL_ID'), os.getenv('LOG_CHANNEL_ID'), ADMIN_ROLE_ID]):
-    print("Ошибка: Одна или несколько обязательных переменных окружения не установлены.")
-    print("Убедитесь, что DISCORD_TOKEN, PARSE_CHANNEL_ID, LOG_CHANNEL_ID и ADMIN_ROLE_ID заданы.")
-    exit()
-
 # --- Настройка намерений (Intents) ---
 intents = discord.Intents.default()
 intents.message_content = True
@@ -29,16 +30,39 @@ class MyBot(commands.Bot):
         self.data_path = os.environ.get('RAILWAY_VOLUME_MOUNT_PATH', '.')
         print(f"Путь для сохранения данных: {self.data_path}")
         os.makedirs(self.data_path, exist_ok=True)
+        # Метрики работы бота: /stats и выгрузка в формате Prometheus
+        self.metrics = Metrics()
+        install_discord_http_metrics(self.metrics)
+        # Сторож цикла событий: сообщает о блокирующем коде со стеком
+        self.loop_watchdog = LoopWatchdog(metrics=self.metrics)
+        # Локальный индекс отчетов из канала парсинга
+        self.event_store = EventStore(os.path.join(self.data_path, 'events.db'), metrics=self.metrics)
+        # Общий кэш имен участников для отчетов
+        self.member_resolver = MemberNameResolver(metrics=self.metrics)
+        # Кэш категорий и списка Blum, перечитывается только при изменении файлов
+        self.config_store = ConfigStore(self.data_path)
+        # Ручные начисления: снимок manual_points.json и журнал изменений
+        self.points_store = PointsStore(os.path.join(self.data_path, 'manual_points.json'))
+        # Кэш результатов отчетов, сбрасывается при изменении данных за соответствующий период
+        self.report_cache = ReportCache()
+        self.event_store.add_listener(self.report_cache.invalidate_times)
+        self.points_store.add_listener(self.report_cache.invalidate_times)
+        self.config_store.add_listener(self.report_cache.on_config_changed)
+        self.metrics.add_collector(self._cache_metrics)
         self.initial_cogs = [
             'cogs.category_cog',
             'cogs.blum_cog',
             'cogs.logs_cog',
             'cogs.help_cog',
-            'cogs.point_cog' # Новый ког для ручного управления баллами
+            'cogs.point_cog', # Новый ког для ручного управления баллами
+            'cogs.ingest_cog', # Прием отчетов из канала парсинга в реальном времени
+            'cogs.scheduler_cog', # Ночной расчет отчетов за прошедшие сутки
+            'cogs.stats_cog' # Метрики работы бота
         ]
 
     async def setup_hook(self):
         """Выполняется при запуске бота для загрузки когов."""
+        self.loop_watchdog.start()
         for cog in self.initial_cogs:
             try:
                 await self.load_extension(cog)
@@ -46,6 +70,24 @@ class MyBot(commands.Bot):
             except Exception as e:
                 print(f"Не удалось загрузить ког '{cog.split('.')[-1]}': {e}")
     
+    async def close(self):
+        """Дописывает на диск несохраненные изменения перед остановкой бота."""
+        await self.points_store.flush()
+        self.loop_watchdog.stop()
+        await super().close()
+
+    def _cache_metrics(self):
+        values = []
+        for cache_name, cache in (('reports', self.report_cache), ('members', self.member_resolver)):
+            values.append(('cache_hits', {'cache': cache_name}, cache.hits))
+            values.append(('cache_misses', {'cache': cache_name}, cache.misses))
+        return values
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        """Время от создания взаимодействия до завершения команды."""
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        self.metrics.observe('command_duration_seconds', elapsed, command=command.qualified_name)
+
     async def on_ready(self):
         """Вызывается, когда бот готов к работе."""
         print(f'Бот {self.user} успешно запущен!')
@@ -77,6 +119,12 @@ async def main():
     await bot.start(TOKEN)
 
 if __name__ == "__main__":
+    # Проверка наличия обязательных переменных. Выполняется только при запуске бота,
+    # чтобы модуль можно было импортировать из бенчмарков и утилит.
+    if not all([TOKEN, os.getenv('PARSE_CHANNEL_ID'), os.getenv('LOG_CHANNEL_ID'), ADMIN_ROLE_ID]):
+        print("Ошибка: Одна или несколько обязательных переменных окружения не установлены.")
+        print("Убедитесь, что DISCORD_TOKEN, PARSE_CHANNEL_ID, LOG_CHANNEL_ID и ADMIN_ROLE_ID заданы.")
+        exit()
     try:
         asyncio.run(main())
     except Exception as e:
@@ -0,0 +1,85 @@
+"""Проверки локального индекса отчетов. Запуск из корня репозитория: python -m pytest tests"""
+import asyncio
+import bisect
+from datetime import datetime, timedelta, timezone
+
+import discord
+from discord.utils import snowflake_time, time_snowflake
+from utils.event_store import EventStore
+from utils.report_parser import REPORT_TITLE
+
+
+class FakeMessage:
+    def __init__(self, created_at, user_id, points, event_name):
+        self.id = time_snowflake(created_at)
+        self.created_at = snowflake_time(self.id)
+        self.embeds = [self._embed(user_id, points, event_name)]
+
+    @staticmethod
+    def _embed(user_id, points, event_name):
+        embed = discord.Embed(title=REPORT_TITLE, description=f"<@{user_id}> `nick_{user_id}`")
+        embed.add_field(name="> Получено", value=f"{points} баллов")
+        embed.add_field(name="Ивент", value=f"`{event_name}`")
+        return embed
+
+    def edit(self, user_id, points, event_name):
+        self.embeds = [self._embed(user_id, points, event_name)]
+
+
+class FakeChannel:
+    def __init__(self, messages):
+        self.messages = sorted(messages, key=lambda m: m.id)
+
+    async def history(self, limit=100, before=None, after=None, oldest_first=None):
+        ids = [m.id for m in self.messages]
+        lo = bisect.bisect_right(ids, after.id) if after is not None else 0
+        hi = bisect.bisect_left(ids, before.id) if before is not None else len(ids)
+        for message in self.messages[lo:hi][:limit]:
+            yield message
+
+
+def _points_by_message(store):
+    return {r.message_id: r.points for r in store.events_in_range(0, 2**40)}
+
+
+def test_rescan_tail_picks_up_offline_edits_and_deletes(tmp_path):
+    now = datetime.now(timezone.utc)
+    old = FakeMessage(now - timedelta(days=10), 1, 10, "Мафия")
+    recent = [FakeMessage(now - timedelta(hours=hours), 2, hours, "Кино") for hours in (30, 20, 10)]
+    channel = FakeChannel([old] + recent)
+    store = EventStore(str(tmp_path / 'events.db'))
+
+    asyncio.run(store.sync(channel))
+    assert len(_points_by_message(store)) == 4
+
+    # Пока бот отключен: старый и свежий отчеты изменены, еще один свежий удален
+    old.edit(1, 99, "Мафия")
+    recent[0].edit(2, 77, "Кино")
+    channel.messages.remove(recent[1])
+
+    asyncio.run(store.sync(channel))
+    asyncio.run(store.rescan_tail(channel, days=3))
+
+    points = _points_by_message(store)
+    assert points[recent[0].id] == 77
+    assert recent[1].id not in points
+    assert points[recent[2].id] == 10
+    # За пределами хвоста индекс не перечитывается
+    assert points[old.id] == 10
+    store.close()
+
+
+def test_rescan_tail_keeps_rollup_in_step(tmp_path):
+    now = datetime.now(timezone.utc)
+    messages = [FakeMessage(now - timedelta(hours=hours), 3, 5, "Квиз") for hours in (5, 4, 3)]
+    channel = FakeChannel(messages)
+    store = EventStore(str(tmp_path / 'events.db'))
+    asyncio.run(store.sync(channel))
+
+    channel.messages.remove(messages[0])
+    messages[1].edit(3, 50, "Квиз")
+    asyncio.run(store.rescan_tail(channel, days=1))
+
+    totals = {(uid, name): (count, points) for uid, name, count, points in store.rollup_in_range('2000-01-01', '2100-01-01')}
+    assert totals == {(3, "Квиз"): (2, 55)}
+    store.close()
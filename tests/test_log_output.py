@@ -0,0 +1,72 @@
+"""Проверки разбиения логов на вложения и сообщения. Запуск из корня репозитория: python -m pytest tests"""
+import asyncio
+import io
+import os
+
+import discord
+from utils.log_output import LogWriter, MAX_FILES_PER_MESSAGE, UPLOAD_REQUEST_OVERHEAD, send_log_files, upload_limit
+
+
+class FakeGuild:
+    filesize_limit = UPLOAD_REQUEST_OVERHEAD + 64 * 1024
+
+
+class FakeChannel:
+    guild = FakeGuild()
+
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, files):
+        self.messages.append([(file.filename, file.fp.read()) for file in files])
+
+
+def test_near_limit_parts_are_sent_in_separate_messages():
+    limit = upload_limit(FakeGuild())
+    part_size = limit - 1024
+    files = [discord.File(io.BytesIO(bytes([i]) * part_size), filename=f"log_part{i}.txt") for i in range(5)]
+    channel = FakeChannel()
+
+    asyncio.run(send_log_files(channel, files))
+
+    assert len(channel.messages) == 5
+    assert all(sum(len(data) for _, data in message) <= limit for message in channel.messages)
+    assert [name for message in channel.messages for name, _ in message] == [f"log_part{i}.txt" for i in range(5)]
+
+
+def test_small_files_are_grouped_by_count():
+    files = [discord.File(io.BytesIO(b"x" * 10), filename=f"log_{i}.txt") for i in range(MAX_FILES_PER_MESSAGE + 3)]
+    channel = FakeChannel()
+
+    asyncio.run(send_log_files(channel, files))
+
+    assert [len(message) for message in channel.messages] == [MAX_FILES_PER_MESSAGE, 3]
+
+
+def test_split_log_fits_guild_limit():
+    guild = FakeGuild()
+    limit = upload_limit(guild)
+    writer = LogWriter()
+    lines = [os.urandom(100).hex() + "\n" for _ in range(2000)]
+    for line in lines:
+        writer.write(line)
+
+    files = writer.to_discord_files("log.txt", limit)
+    channel = FakeChannel()
+    asyncio.run(send_log_files(channel, files))
+
+    assert len(files) > 1
+    assert all(sum(len(data) for _, data in message) <= limit for message in channel.messages)
+    assert b"".join(data for message in channel.messages for _, data in message).decode() == "".join(lines)
+
+
+def test_no_limit_keeps_one_plain_file():
+    writer = LogWriter()
+    lines = [os.urandom(100).hex() + "\n" for _ in range(2000)]
+    for line in lines:
+        writer.write(line)
+
+    files = writer.to_discord_files("log.txt", 0)
+
+    assert [file.filename for file in files] == ["log.txt"]
+    assert files[0].fp.read().decode() == "".join(lines)
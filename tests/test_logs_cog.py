@@ -0,0 +1,102 @@
+"""Проверки разбора периодов и суточной сводки отчетов. Запуск из корня репозитория: python -m pytest tests"""
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from utils.offline_env import stub_bot_env
+
+stub_bot_env()
+
+from discord.utils import time_snowflake
+from cogs.logs_cog import LogsCog
+from utils.event_store import EventStore
+from utils.points_store import PointsStore
+from utils.report_parser import ReportRecord
+
+YEAR = datetime.now().year
+
+# Период -> (начало, конец) как (год, месяц, день) московских полуночей; конец не входит в период
+DATE_RANGES = [
+    ("21.09", (YEAR, 9, 21), (YEAR, 9, 22)),
+    ("21.09-25.09", (YEAR, 9, 21), (YEAR, 9, 26)),
+    ("21.09.2024", (2024, 9, 21), (2024, 9, 22)),
+    ("21.09.24", (2024, 9, 21), (2024, 9, 22)),
+    ("01.09.25-30.09.25", (2025, 9, 1), (2025, 10, 1)),
+    ("09.2025", (2025, 9, 1), (2025, 10, 1)),
+    ("12.2024", (2024, 12, 1), (2025, 1, 1)),
+    ("11.2024-01.2025", (2024, 11, 1), (2025, 2, 1)),
+    ("25.12-05.01", (YEAR - 1, 12, 25), (YEAR, 1, 6)),
+    ("25.12-05.01.2025", (2024, 12, 25), (2025, 1, 6)),
+    ("25.12.2024-05.01", (2024, 12, 25), (2025, 1, 6)),
+    ("29.02.2024", (2024, 2, 29), (2024, 3, 1)),
+]
+
+
+@pytest.fixture
+def cog():
+    return LogsCog(SimpleNamespace(config_store=None))
+
+
+@pytest.mark.parametrize("date_range, start, end", DATE_RANGES)
+def test_parse_date_range(cog, date_range, start, end):
+    start_date, end_date = cog.parse_date_range(date_range)
+    assert start_date == cog.moscow_tz.localize(datetime(*start))
+    assert end_date == cog.moscow_tz.localize(datetime(*end))
+
+
+@pytest.mark.parametrize("date_range", ["32.01", "21.13", "21.09-", "21/09", "30.02.2025", "25.09.2025-21.09.2025"])
+def test_parse_date_range_rejects_bad_input(cog, date_range):
+    with pytest.raises(ValueError):
+        cog.parse_date_range(date_range)
+
+
+def _record(message_id, user_id, points, event_name, when):
+    return ReportRecord(message_id, 0, user_id, f"nick_{user_id}", points, event_name, when.timestamp())
+
+
+def test_rollup_totals_match_per_event_totals(cog, tmp_path):
+    utc = timezone.utc
+    # Отчеты вокруг московской полуночи на обеих границах периода и внутри него
+    moments = [
+        datetime(2025, 9, 20, 20, 59, 59, tzinfo=utc), datetime(2025, 9, 20, 21, 0, tzinfo=utc),
+        datetime(2025, 9, 21, 20, 30, tzinfo=utc), datetime(2025, 9, 21, 21, 30, tzinfo=utc),
+        datetime(2025, 9, 22, 20, 59, 59, tzinfo=utc), datetime(2025, 9, 22, 21, 0, tzinfo=utc),
+    ]
+    records = []
+    for i, when in enumerate(moments):
+        message_id = time_snowflake(when) + i
+        records.append(_record(message_id, 1 + i % 2, (i * 7) % 20, ("Мафия", "Кино")[i % 3 == 0], when))
+
+    store = EventStore(str(tmp_path / 'events.db'))
+    store.upsert_messages([(record.message_id, [record]) for record in records])
+    points_store = PointsStore(str(tmp_path / 'manual_points.json'))
+    overridden = records[2]
+    asyncio.run(points_store.add({
+        'entry_id': 'override', 'user_id': overridden.user_id, 'points': 50, 'event_name': overridden.event_name,
+        'end_time_iso': datetime.fromtimestamp(overridden.created_at, utc).isoformat(),
+        'original_message_id': overridden.message_id,
+    }))
+    asyncio.run(points_store.add({
+        'entry_id': 'manual', 'user_id': 3, 'points': 4, 'event_name': "Квиз",
+        'end_time_iso': '2025-09-22T23:59:00+03:00',
+    }))
+    cog.bot = SimpleNamespace(event_store=store, points_store=points_store)
+
+    start_time, end_time = cog.parse_date_range("21.09.2025-22.09.2025")
+    start_ts, end_ts = start_time.timestamp(), end_time.timestamp()
+    expected = {}
+    for record in store.events_in_range(start_ts, end_ts):
+        if record.points > 0 and record.message_id != overridden.message_id:
+            total = expected.setdefault((record.user_id, record.event_name), [0, 0])
+            total[0] += 1
+            total[1] += record.points
+    for entry in points_store.in_range(start_ts, end_ts):
+        total = expected.setdefault((entry['user_id'], entry['event_name']), [0, 0])
+        total[0] += 1
+        total[1] += entry['points']
+
+    rollups = cog._collect_rollups(start_time, end_time, {})
+    assert {(e.user_id, e.event_name): [e.count, e.points] for e in rollups} == expected
+    assert sum(count for count, _ in expected.values()) == 5
+    store.close()
@@ -0,0 +1,67 @@
+"""Проверки расчета ночных бонусов. Запуск из корня репозитория: python -m pytest tests"""
+from datetime import datetime
+
+import pytest
+from utils.moscow_time import MOSCOW_TZ
+from utils.night_bonus import DEFAULT_NIGHT_BONUS, NightBonusEngine, parse_window
+
+
+def moscow_ts(day, hour, minute=0):
+    return MOSCOW_TZ.localize(datetime(2025, 9, day, hour, minute)).timestamp()
+
+
+def night_minutes(engine, user_id, start, end):
+    _, minutes, _ = engine.bonuses([user_id], [start], [end])
+    return minutes[0]
+
+
+@pytest.mark.parametrize("start, end, minutes", [
+    # Окно 23:00-05:00 переходит через полночь
+    (moscow_ts(21, 22, 0), moscow_ts(21, 23, 30), 30),
+    (moscow_ts(21, 23, 30), moscow_ts(22, 1, 0), 90),
+    (moscow_ts(22, 4, 0), moscow_ts(22, 6, 0), 60),
+    (moscow_ts(21, 12, 0), moscow_ts(21, 20, 0), 0),
+    # Несколько ночей подряд: 1 ч в первую ночь, 6 ч во вторую и 2 ч в третью
+    (moscow_ts(21, 4, 0), moscow_ts(23, 1, 0), 60 + 360 + 120),
+])
+def test_window_crossing_midnight(start, end, minutes):
+    engine = NightBonusEngine({'default': {'start': '23:00', 'end': '05:00', 'multiplier': 2.0}})
+    assert night_minutes(engine, 1, start, end) == minutes
+
+
+def test_event_spanning_several_nights():
+    engine = NightBonusEngine({'default': {'start': '02:00', 'end': '08:00', 'multiplier': 1.5}})
+    multipliers, minutes, points = engine.bonuses([1], [moscow_ts(21, 22)], [moscow_ts(23, 6)])
+    assert (multipliers[0], minutes[0], points[0]) == (1.5, 600, 300)
+
+
+def test_explicit_users_and_default_fallback():
+    settings = {
+        'vip': {'start': '00:00', 'end': '06:00', 'multiplier': 3.0, 'users': ['10']},
+        'blum': {'start': '02:00', 'end': '08:00', 'multiplier': 2.0},
+        'default': {'start': '03:00', 'end': '07:00', 'multiplier': 1.5},
+    }
+    engine = NightBonusEngine(settings, {'blum': [20, 10]})
+    start, end = moscow_ts(21, 1), moscow_ts(21, 4)
+
+    multipliers, minutes, points = engine.bonuses([10, 20, 30], [start] * 3, [end] * 3)
+    # Участник из нескольких групп получает первую по порядку настроек
+    assert list(multipliers) == [3.0, 2.0, 1.5]
+    assert list(minutes) == [180, 120, 60]
+    assert list(points) == [360, 120, 30]
+
+
+def test_without_default_group_bonus_is_zero():
+    engine = NightBonusEngine({'blum': {'start': '02:00', 'end': '08:00', 'multiplier': 2.0}}, {'blum': [1]})
+    multipliers, minutes, points = engine.bonuses([2], [moscow_ts(21, 2)], [moscow_ts(21, 5)])
+    assert (multipliers[0], minutes[0], points[0]) == (1.0, 0, 0)
+    assert engine.night_mask([moscow_ts(21, 2), moscow_ts(21, 12)], [moscow_ts(21, 3), moscow_ts(21, 13)]) == [True, False]
+
+
+def test_default_settings():
+    engine = NightBonusEngine(DEFAULT_NIGHT_BONUS, {'blum': [1]})
+    start, end = moscow_ts(21, 2), moscow_ts(21, 4)
+    _, minutes, points = engine.bonuses([1, 2], [start, start], [end, end])
+    assert list(minutes) == [120, 60]
+    assert list(points) == [120, 30]
+    assert parse_window(DEFAULT_NIGHT_BONUS['default']) == (3 * 3600, 4 * 3600, 1.5)
@@ -0,0 +1,189 @@
+"""Проверки хранилища ручных баллов. Запуск из корня репозитория: python -m pytest tests"""
+import asyncio
+import json
+import time
+
+import utils.points_store
+from utils.points_store import PointsStore
+
+
+def make_entry(entry_id, points=5, hour=1, user_id=1, original_message_id=None):
+    return {
+        'entry_id': entry_id, 'user_id': user_id, 'points': points, 'event_name': 'Мафия',
+        'end_time_iso': f'2025-09-21T{hour:02d}:00:00+03:00', 'original_message_id': original_message_id,
+    }
+
+
+def test_concurrent_overrides_of_one_report_keep_single_entry(tmp_path):
+    async def run():
+        store = PointsStore(str(tmp_path / 'manual_points.json'))
+        await asyncio.gather(
+            store.set_override(make_entry('a', points=10, original_message_id=42), points=10),
+            store.set_override(make_entry('b', points=20, original_message_id=42), points=20),
+        )
+        return store
+
+    store = asyncio.run(run())
+    overrides = [(e['points'], e['original_message_id']) for e in store.entries()]
+    assert overrides == [(20, 42)]
+    assert PointsStore(store.snapshot_file).by_original_message(42)['points'] == 20
+
+
+def test_invalid_change_is_rejected_before_journaling(tmp_path):
+    async def run():
+        store = PointsStore(str(tmp_path / 'manual_points.json'))
+        await store.add(make_entry('a'))
+        for bad in (dict(make_entry('b'), end_time_iso='28.09 23:59'), {'entry_id': 'c', 'points': 1}):
+            try:
+                await store.add(bad)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("некорректная запись принята")
+        return store
+
+    store = asyncio.run(run())
+    assert [e['entry_id'] for e in store.entries()] == ['a']
+    with open(store.journal_file, encoding='utf-8') as f:
+        assert len(f.readlines()) == 1
+    assert [e['entry_id'] for e in PointsStore(store.snapshot_file).entries()] == ['a']
+
+
+def test_replay_skips_bad_journal_op(tmp_path):
+    store = PointsStore(str(tmp_path / 'manual_points.json'))
+    bad = json.dumps({'op': 'add', 'entry': dict(make_entry('bad'), end_time_iso='не время')}, ensure_ascii=False)
+    good = json.dumps({'op': 'add', 'entry': make_entry('good')}, ensure_ascii=False)
+    with open(store.journal_file, 'w', encoding='utf-8') as f:
+        f.write(bad + '\n' + good + '\n')
+
+    reloaded = PointsStore(store.snapshot_file)
+    assert [e['entry_id'] for e in reloaded.entries()] == ['good']
+    assert [e['entry_id'] for e in reloaded.in_range(0, 2**40)] == ['good']
+
+
+def _ids(store):
+    return [e['entry_id'] for e in store.in_range(0, 2**40)]
+
+
+def test_journal_replay_restores_state(tmp_path):
+    async def run():
+        store = PointsStore(str(tmp_path / 'manual_points.json'))
+        for i, hour in enumerate((3, 1, 2)):
+            await store.add(make_entry(f'e{i}', hour=hour, original_message_id=100 + i))
+        await store.update('e0', points=50, end_time_iso='2025-09-21T00:30:00+03:00')
+        await store.remove('e2')
+        return store
+
+    store = asyncio.run(run())
+    reloaded = PointsStore(store.snapshot_file)
+    assert _ids(reloaded) == _ids(store) == ['e0', 'e1']
+    assert reloaded.get('e0')['points'] == 50
+    assert reloaded.by_original_message(102) is None
+    assert [e['entry_id'] for e in reloaded.latest(1)] == ['e1']
+
+
+def test_torn_journal_tail_is_dropped_and_compacted(tmp_path):
+    async def run():
+        store = PointsStore(str(tmp_path / 'manual_points.json'))
+        await store.add(make_entry('a'))
+        await store.add(make_entry('b', hour=2))
+        return store
+
+    store = asyncio.run(run())
+    with open(store.journal_file, 'a', encoding='utf-8') as f:
+        f.write('{"op": "add", "entry": {"entry_id": "c"')
+
+    reloaded = PointsStore(store.snapshot_file)
+    assert _ids(reloaded) == ['a', 'b']
+    with open(reloaded.journal_file, encoding='utf-8') as f:
+        assert f.read() == ''
+    assert _ids(PointsStore(store.snapshot_file)) == ['a', 'b']
+
+
+def test_journal_is_compacted_into_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils.points_store, 'JOURNAL_COMPACT_THRESHOLD', 3)
+
+    async def run():
+        store = PointsStore(str(tmp_path / 'manual_points.json'))
+        for i in range(4):
+            await store.add(make_entry(f'e{i}', hour=i))
+        return store
+
+    store = asyncio.run(run())
+    with open(store.snapshot_file, encoding='utf-8') as f:
+        assert sorted(e['entry_id'] for e in json.load(f)) == ['e0', 'e1', 'e2']
+    with open(store.journal_file, encoding='utf-8') as f:
+        assert len(f.readlines()) == 1
+    assert _ids(PointsStore(store.snapshot_file)) == ['e0', 'e1', 'e2', 'e3']
+
+
+def test_concurrent_changes_share_one_write(tmp_path):
+    store = PointsStore(str(tmp_path / 'manual_points.json'))
+    writes = []
+    write_batch = store._write_batch
+
+    def counting_write(lines, snapshot):
+        writes.append(len(lines))
+        write_batch(lines, snapshot)
+
+    store._write_batch = counting_write
+
+    async def run():
+        await asyncio.gather(*(store.add(make_entry(f'e{i}', hour=i)) for i in range(5)))
+
+    asyncio.run(run())
+    assert writes == [5]
+    assert len(_ids(PointsStore(store.snapshot_file))) == 5
+
+
+def test_change_is_applied_only_after_successful_write(tmp_path):
+    store = PointsStore(str(tmp_path / 'manual_points.json'))
+    notified = []
+    store.add_listener(notified.append)
+    write_batch = store._write_batch
+
+    def failing_write(lines, snapshot):
+        raise OSError("диск недоступен")
+
+    async def run():
+        store._write_batch = failing_write
+        try:
+            await store.add(make_entry('a'))
+        except OSError:
+            pass
+        else:
+            raise AssertionError("ошибка записи не дошла до вызывающего")
+        assert store.entries() == [] and notified == []
+
+        store._write_batch = write_batch
+        await store.add(make_entry('b'))
+
+    asyncio.run(run())
+    assert _ids(store) == ['b']
+    assert len(notified) == 1
+    assert _ids(PointsStore(store.snapshot_file)) == ['b']
+
+
+def test_cancelled_waiter_does_not_break_writer(tmp_path):
+    store = PointsStore(str(tmp_path / 'manual_points.json'))
+    write_batch = store._write_batch
+
+    def slow_write(lines, snapshot):
+        time.sleep(0.05)
+        write_batch(lines, snapshot)
+
+    store._write_batch = slow_write
+
+    async def run():
+        first = asyncio.create_task(store.add(make_entry('a')))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(store.add(make_entry('b', hour=2)))
+        await asyncio.sleep(0)
+        second.cancel()
+        await first
+        await store.flush()
+
+    asyncio.run(run())
+    # Отмена ожидания не отменяет уже поставленное в очередь изменение
+    assert _ids(store) == ['a', 'b']
+    assert _ids(PointsStore(store.snapshot_file)) == ['a', 'b']
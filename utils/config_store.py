@@ -0,0 +1,133 @@
+import json
+import os
+from utils.listeners import ListenerMixin
+from utils.night_bonus import DEFAULT_NIGHT_BONUS
+
+
+class ConfigStore(ListenerMixin):
+    """Общий кэш настроек бота: categories.json, blum_list.json и night_bonus.json.
+
+    Файлы перечитываются только после изменения на диске. Подписчики, добавленные через
+    add_listener, получают имя изменившейся настройки ('categories', 'blum' или 'night_bonus').
+    """
+
+    def __init__(self, data_path):
+        self.categories_file = os.path.join(data_path, 'categories.json')
+        self.blum_file = os.path.join(data_path, 'blum_list.json')
+        self.night_bonus_file = os.path.join(data_path, 'night_bonus.json')
+        self._stamps = {}
+        self._categories = {}
+        self._category_lookup = {}
+        self._blum_list = []
+        self._blum_set = frozenset()
+        self._night_bonus = DEFAULT_NIGHT_BONUS
+        self._listeners = []
+
+    # --- Уведомления ---
+
+    LISTENER_ERROR = "Ошибка в обработчике изменения настроек"
+
+    # --- Чтение и запись файлов ---
+
+    @staticmethod
+    def _stamp(filename):
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _is_stale(self, filename):
+        return self._stamps.get(filename, False) != self._stamp(filename)
+
+    @staticmethod
+    def _read_json(filename, default_value):
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return default_value
+
+    def _write_json(self, filename, data):
+        tmp_file = filename + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_file, filename)
+        self._stamps[filename] = self._stamp(filename)
+
+    # --- Категории ---
+
+    def _set_categories(self, categories):
+        lookup = {}
+        for category, event_list in categories.items():
+            for event_name in event_list:
+                # Если ивент указан в нескольких категориях, побеждает первая
+                lookup.setdefault(event_name.casefold(), category)
+        self._categories = categories
+        self._category_lookup = lookup
+
+    def _refresh_categories(self):
+        if self._is_stale(self.categories_file):
+            self._stamps[self.categories_file] = self._stamp(self.categories_file)
+            self._set_categories(self._read_json(self.categories_file, {}))
+            self._notify('categories')
+
+    def categories(self):
+        """Словарь "категория -> список ивентов". Изменять его нельзя — копию для изменений дает editable_categories."""
+        self._refresh_categories()
+        return self._categories
+
+    def category_lookup(self):
+        """Словарь "название ивента (casefold) -> категория"."""
+        self._refresh_categories()
+        return self._category_lookup
+
+    def editable_categories(self):
+        """Копия категорий для изменения и последующего save_categories: общий кэш до сохранения не меняется."""
+        return {name: list(events) for name, events in self.categories().items()}
+
+    def save_categories(self, categories):
+        # Кэш хранит свою копию, чтобы дальнейшие изменения переданного словаря его не затронули
+        categories = {name: list(events) for name, events in categories.items()}
+        self._write_json(self.categories_file, categories)
+        self._set_categories(categories)
+        self._notify('categories')
+
+    # --- Список Blum ---
+
+    def _refresh_blum(self):
+        if self._is_stale(self.blum_file):
+            self._stamps[self.blum_file] = self._stamp(self.blum_file)
+            self._blum_list = self._read_json(self.blum_file, [])
+            self._blum_set = frozenset(self._blum_list)
+            self._notify('blum')
+
+    def blum_list(self):
+        """Список Blum в порядке добавления. Изменять его нельзя — копию для изменений дает editable_blum_list."""
+        self._refresh_blum()
+        return self._blum_list
+
+    def blum_set(self):
+        self._refresh_blum()
+        return self._blum_set
+
+    def editable_blum_list(self):
+        """Копия списка Blum для изменения и последующего save_blum_list."""
+        return list(self.blum_list())
+
+    def save_blum_list(self, blum_list):
+        blum_list = list(blum_list)
+        self._write_json(self.blum_file, blum_list)
+        self._blum_list = blum_list
+        self._blum_set = frozenset(blum_list)
+        self._notify('blum')
+
+    # --- Ночные бонусы ---
+
+    def night_bonus(self):
+        """Ночные окна и множители по группам. Без файла night_bonus.json действуют DEFAULT_NIGHT_BONUS."""
+        if self._is_stale(self.night_bonus_file):
+            self._stamps[self.night_bonus_file] = self._stamp(self.night_bonus_file)
+            self._night_bonus = self._read_json(self.night_bonus_file, DEFAULT_NIGHT_BONUS)
+            self._notify('night_bonus')
+        return self._night_bonus
@@ -0,0 +1,341 @@
+import asyncio
+import os
+import sqlite3
+import discord
+from discord.utils import time_snowflake
+from datetime import datetime, timedelta, timezone
+from utils.history import AdaptivePacer
+from utils.listeners import ListenerMixin
+from utils.moscow_time import moscow_day
+from utils.report_parser import ReportRecord, parse_report_message
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    message_id INTEGER NOT NULL,
+    embed_index INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    user_nick TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    event_name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (message_id, embed_index)
+);
+CREATE INDEX IF NOT EXISTS idx_events_created_at ON events(created_at);
+CREATE INDEX IF NOT EXISTS idx_events_user ON events(user_id, message_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+-- Суточная сводка по отчетам с баллами > 0. Московские сутки отчета считает функция moscow_day,
+-- которую EventStore регистрирует в соединении (pytz, Europe/Moscow).
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    day TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    event_name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (day, user_id, event_name)
+);
+CREATE TRIGGER IF NOT EXISTS events_rollup_insert AFTER INSERT ON events WHEN NEW.points > 0
+BEGIN
+    INSERT INTO daily_rollup (day, user_id, event_name, count, points)
+    VALUES (moscow_day(NEW.created_at), NEW.user_id, NEW.event_name, 1, NEW.points)
+    ON CONFLICT (day, user_id, event_name) DO UPDATE SET count = count + 1, points = points + excluded.points;
+END;
+CREATE TRIGGER IF NOT EXISTS events_rollup_delete AFTER DELETE ON events WHEN OLD.points > 0
+BEGIN
+    UPDATE daily_rollup SET count = count - 1, points = points - OLD.points
+    WHERE day = moscow_day(OLD.created_at) AND user_id = OLD.user_id AND event_name = OLD.event_name;
+    DELETE FROM daily_rollup
+    WHERE day = moscow_day(OLD.created_at) AND user_id = OLD.user_id AND event_name = OLD.event_name
+        AND count <= 0;
+END;
+"""
+
+# Триггеры прежних версий считали сутки сдвигом на UTC+3 — при обновлении схемы они пересоздаются
+DROP_ROLLUP_TRIGGERS = """
+DROP TRIGGER IF EXISTS events_rollup_insert;
+DROP TRIGGER IF EXISTS events_rollup_delete;
+"""
+
+# Заполнение сводки для баз, созданных до ее появления или до смены расчета суток
+ROLLUP_BACKFILL = """
+DELETE FROM daily_rollup;
+INSERT INTO daily_rollup (day, user_id, event_name, count, points)
+SELECT moscow_day(created_at), user_id, event_name, COUNT(*), SUM(points)
+FROM events WHERE points > 0
+GROUP BY 1, 2, 3;
+"""
+SCHEMA_VERSION = 2
+
+EVENT_COLUMNS = ', '.join(ReportRecord._fields)
+
+# Сколько сообщений запрашивать за раз при обходе истории (максимум Discord для одного запроса)
+BACKFILL_BATCH_SIZE = 100
+# Раз в сколько пакетов печатать прогресс обхода
+BACKFILL_PROGRESS_EVERY = 100
+# За сколько последних суток история перечитывается при повторной синхронизации
+RESCAN_TAIL_DAYS = int(os.getenv("RESCAN_TAIL_DAYS", 3))
+
+
+class EventStore(ListenerMixin):
+    """Локальный индекс отчетов об ивентах из канала парсинга (SQLite)."""
+
+    def __init__(self, db_path, metrics=None):
+        self.db_path = db_path
+        self.metrics = metrics
+        self._conn = sqlite3.connect(db_path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # Триггеры сводки вызывают moscow_day, поэтому функция нужна каждому соединению с базой
+        self._conn.create_function('moscow_day', 1, moscow_day, deterministic=True)
+        outdated = self._conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION
+        if outdated:
+            self._conn.executescript(DROP_ROLLUP_TRIGGERS)
+        self._conn.executescript(SCHEMA)
+        if outdated:
+            self._conn.executescript(ROLLUP_BACKFILL)
+            self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self._conn.commit()
+        self._sync_lock = asyncio.Lock()
+        # True, пока новые сообщения канала поступают в индекс в реальном времени
+        self.live = False
+        self._listeners = []
+
+    # --- Уведомления ---
+
+    # Подписчики получают список отметок времени (секунды эпохи) измененных сообщений
+    LISTENER_ERROR = "Ошибка в обработчике изменения индекса отчетов"
+
+    def _notify_messages(self, message_ids):
+        if not self._listeners or not message_ids:
+            return
+        self._notify([discord.utils.snowflake_time(message_id).timestamp() for message_id in message_ids])
+
+    # --- Служебные значения ---
+
+    def _get_meta(self, key, default=None):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else default
+
+    def _set_meta(self, key, value):
+        self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    @property
+    def is_backfilled(self):
+        """True, если вся история канала уже была проиндексирована хотя бы один раз."""
+        return self._get_meta('backfill_complete') == '1'
+
+    @property
+    def last_message_id(self):
+        value = self._get_meta('last_message_id')
+        return int(value) if value else None
+
+    # --- Запись ---
+
+    def upsert_messages(self, messages, checkpoint=None):
+        """Сохраняет отчеты сообщений. messages — список пар (message_id, records).
+
+        checkpoint — id сообщения, до которого история обойдена; записывается в той же транзакции.
+        """
+        with self._conn:
+            if checkpoint is not None:
+                self._set_meta('last_message_id', max(checkpoint, self.last_message_id or 0))
+            for message_id, records in messages:
+                self._conn.execute('DELETE FROM events WHERE message_id = ?', (message_id,))
+                self._conn.executemany(
+                    f'INSERT INTO events ({EVENT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    records
+                )
+        self._notify_messages([message_id for message_id, _ in messages])
+
+    def mark_backfilled(self):
+        """Отмечает, что история канала до last_message_id проиндексирована целиком."""
+        with self._conn:
+            self._set_meta('backfill_complete', 1)
+
+    def mark_seen(self, message_id):
+        """Сдвигает отметку синхронизации на сообщение, полученное в реальном времени."""
+        last_id = self.last_message_id
+        if last_id is None or message_id > last_id:
+            with self._conn:
+                self._set_meta('last_message_id', message_id)
+
+    def delete_messages(self, message_ids):
+        with self._conn:
+            self._conn.executemany('DELETE FROM events WHERE message_id = ?', [(mid,) for mid in message_ids])
+        self._notify_messages(list(message_ids))
+
+    # --- Чтение ---
+
+    def events_in_range(self, start_ts, end_ts):
+        """Возвращает отчеты в промежутке [start_ts, end_ts) в хронологическом порядке."""
+        rows = self._conn.execute(
+            f'SELECT {EVENT_COLUMNS} FROM events WHERE created_at >= ? AND created_at < ? '
+            'ORDER BY created_at, message_id, embed_index',
+            (start_ts, end_ts)
+        )
+        return [ReportRecord._make(row) for row in rows]
+
+    def recent_events(self, user_id, limit):
+        """Возвращает limit последних отчетов пользователя, начиная с самого нового."""
+        rows = self._conn.execute(
+            f'SELECT {EVENT_COLUMNS} FROM events WHERE user_id = ? ORDER BY message_id DESC, embed_index DESC LIMIT ?',
+            (user_id, limit)
+        )
+        return [ReportRecord._make(row) for row in rows]
+
+    def rollup_in_range(self, start_day, end_day):
+        """Суммы (user_id, event_name, count, points) по суточной сводке за дни [start_day, end_day)."""
+        return self._conn.execute(
+            'SELECT user_id, event_name, SUM(count), SUM(points) FROM daily_rollup '
+            'WHERE day >= ? AND day < ? GROUP BY user_id, event_name',
+            (start_day, end_day)
+        ).fetchall()
+
+    def events_for_messages(self, message_ids, start_ts, end_ts):
+        """Отчеты из сообщений message_ids, отправленные в промежутке [start_ts, end_ts)."""
+        message_ids = list(message_ids)
+        records = []
+        # Ограничение SQLite на количество параметров в одном запросе
+        for i in range(0, len(message_ids), 500):
+            chunk = message_ids[i:i + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = self._conn.execute(
+                f'SELECT {EVENT_COLUMNS} FROM events WHERE message_id IN ({placeholders}) '
+                'AND created_at >= ? AND created_at < ?',
+                (*chunk, start_ts, end_ts)
+            )
+            records.extend(ReportRecord._make(row) for row in rows)
+        return records
+
+    def records_by_message(self, after_id, before_id):
+        """Отчеты сообщений с id в (after_id, before_id], сгруппированные по message_id."""
+        rows = self._conn.execute(
+            f'SELECT {EVENT_COLUMNS} FROM events WHERE message_id > ? AND message_id <= ? '
+            'ORDER BY message_id, embed_index',
+            (after_id, before_id)
+        )
+        grouped = {}
+        for row in rows:
+            record = ReportRecord._make(row)
+            grouped.setdefault(record.message_id, []).append(record)
+        return grouped
+
+    def latest_nicks(self, user_ids):
+        """Возвращает последний известный ник для каждого пользователя из user_ids."""
+        nicks = {}
+        for user_id in user_ids:
+            row = self._conn.execute(
+                'SELECT user_nick FROM events WHERE user_id = ? ORDER BY message_id DESC, embed_index DESC LIMIT 1',
+                (user_id,)
+            ).fetchone()
+            if row:
+                nicks[user_id] = row['user_nick']
+        return nicks
+
+    def nicks_for_messages(self, message_ids):
+        """Возвращает ник из отчета для каждого сообщения из message_ids."""
+        nicks = {}
+        for message_id in message_ids:
+            row = self._conn.execute(
+                'SELECT user_nick FROM events WHERE message_id = ? ORDER BY embed_index DESC LIMIT 1',
+                (message_id,)
+            ).fetchone()
+            if row:
+                nicks[message_id] = row['user_nick']
+        return nicks
+
+    # --- Синхронизация с каналом ---
+
+    async def sync(self, channel):
+        """Дочитывает историю канала после последнего проиндексированного сообщения.
+
+        История читается пакетами по BACKFILL_BATCH_SIZE сообщений в порядке id, и после каждого пакета
+        отчеты вместе с отметкой последнего сообщения записываются одной транзакцией. Поэтому
+        прерванный обход (перезапуск, разрыв соединения, ошибка) продолжается с места остановки.
+        """
+        async with self._sync_lock:
+            cursor = self.last_message_id or 0
+            pacer = AdaptivePacer(self.metrics)
+            scanned_messages = scanned_embeds = batches = 0
+            while True:
+                batch = [
+                    message async for message in
+                    channel.history(limit=BACKFILL_BATCH_SIZE, after=discord.Object(id=cursor), oldest_first=True)
+                ]
+                batches += 1
+                if batch:
+                    cursor = max(message.id for message in batch)
+                    self.upsert_messages([(message.id, parse_report_message(message)) for message in batch], checkpoint=cursor)
+                    scanned_messages += len(batch)
+                    scanned_embeds += sum(len(message.embeds) for message in batch)
+                if len(batch) < BACKFILL_BATCH_SIZE:
+                    break
+                if batches % BACKFILL_PROGRESS_EVERY == 0:
+                    print(f"Индекс отчетов: обойдено {scanned_messages} сообщений, пауза между запросами {pacer.delay:.2f} с.")
+                await pacer.wait()
+            self.mark_backfilled()
+            if self.metrics:
+                self.metrics.record_history_scan('index_sync', scanned_messages, scanned_embeds, calls=batches)
+
+    async def rescan_tail(self, channel, days=RESCAN_TAIL_DAYS):
+        """Перечитывает уже проиндексированные сообщения за последние days суток.
+
+        Пока бот не подключен, правки и удаления отчетов в индекс не попадают, а sync дочитывает
+        только новые сообщения. Поэтому после перезапуска или переподключения последние сутки
+        сверяются с каналом: измененные отчеты перезаписываются, удаленные — удаляются.
+        Изменения старше days суток, сделанные без бота, так и остаются в индексе —
+        для них нужна полная пересборка (удалить events.db и перезапустить бота).
+        """
+        last_id = self.last_message_id
+        if days <= 0 or last_id is None:
+            return
+        since_id = time_snowflake(datetime.now(timezone.utc) - timedelta(days=days))
+        if since_id >= last_id:
+            return
+        async with self._sync_lock:
+            stored = self.records_by_message(since_id, last_id)
+            pacer = AdaptivePacer(self.metrics)
+            cursor = since_id
+            seen = set()
+            scanned_messages = scanned_embeds = batches = changed = 0
+            while True:
+                batch = [
+                    message async for message in channel.history(
+                        limit=BACKFILL_BATCH_SIZE, after=discord.Object(id=cursor),
+                        before=discord.Object(id=last_id + 1), oldest_first=True
+                    )
+                ]
+                batches += 1
+                updates = []
+                for message in batch:
+                    seen.add(message.id)
+                    records = parse_report_message(message)
+                    if records != stored.get(message.id, []):
+                        updates.append((message.id, records))
+                if updates:
+                    self.upsert_messages(updates)
+                    changed += len(updates)
+                scanned_messages += len(batch)
+                scanned_embeds += sum(len(message.embeds) for message in batch)
+                if len(batch) < BACKFILL_BATCH_SIZE:
+                    break
+                cursor = max(message.id for message in batch)
+                await pacer.wait()
+            deleted = [message_id for message_id in stored if message_id not in seen]
+            if deleted:
+                self.delete_messages(deleted)
+            if changed or deleted:
+                print(f"Индекс отчетов: за последние {days} сут. обновлено сообщений: {changed}, удалено: {len(deleted)}.")
+            if self.metrics:
+                self.metrics.record_history_scan('index_rescan', scanned_messages, scanned_embeds, calls=batches)
+
+    async def refresh(self, channel):
+        """Дочитывает новые сообщения, если индекс сейчас не получает их в реальном времени."""
+        if not self.live:
+            await self.sync(channel)
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from datetime import timedelta
+import discord
+from discord.utils import time_snowflake
+from utils.report_parser import parse_report_message
+from utils import profiling
+from utils.metrics import HISTORY_PAGE_SIZE
+
+# Размер окна и количество окон, читаемых одновременно
+HISTORY_WINDOW = timedelta(days=1)
+HISTORY_FETCH_CONCURRENCY = 4
+# Шаг и предел паузы между пакетами при обходе истории, в секундах
+PACER_STEP = 0.25
+PACER_MAX_DELAY = 5.0
+
+
+class AdaptivePacer:
+    """Паузы между пакетами запросов истории по схеме AIMD.
+
+    Признак упора в ограничения частоты — ответы 429 в метриках discord.http. Исчерпанные корзины
+    не учитываются: при обходе истории корзина исчерпывается регулярно, а discord.py и так выжидает ее сброс.
+    Если с прошлого пакета такие события были, пауза удваивается, иначе уменьшается на шаг.
+    Без метрик пауз нет — discord.py все равно соблюдает ограничения сам.
+    """
+
+    def __init__(self, metrics=None, step=PACER_STEP, max_delay=PACER_MAX_DELAY):
+        self.metrics = metrics
+        self.step = step
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self._last_pressure = self._pressure()
+
+    def _pressure(self):
+        if not self.metrics:
+            return 0
+        return sum(self.metrics.counters('rate_limit_hits_total').values())
+
+    async def wait(self):
+        pressure = self._pressure()
+        if pressure > self._last_pressure:
+            self.delay = min(self.max_delay, max(self.delay * 2, self.step))
+        else:
+            self.delay = max(0.0, self.delay - self.step)
+        self._last_pressure = pressure
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+
+async def fetch_report_records(channel, start_time, end_time, window=HISTORY_WINDOW, concurrency=HISTORY_FETCH_CONCURRENCY, metrics=None, report_type=None):
+    """Читает отчеты за [start_time, end_time) параллельно по окнам.
+
+    Запросы идут через обычный клиент discord.py, поэтому ограничения частоты соблюдаются им же;
+    семафор лишь не дает открыть слишком много окон сразу. Результат упорядочен по времени,
+    повторы по сообщению отбрасываются.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_window(window_start, window_end):
+        # Границы задаются через snowflake, чтобы сообщение ровно на границе попало ровно в одно окно
+        after = discord.Object(id=time_snowflake(window_start) - 1)
+        before = discord.Object(id=time_snowflake(window_end))
+        records = []
+        scanned_messages = scanned_embeds = 0
+        parse_seconds = 0.0
+        async with semaphore:
+            window_started = time.perf_counter()
+            async for message in channel.history(limit=None, after=after, before=before, oldest_first=True):
+                parse_started = time.perf_counter()
+                records.extend(parse_report_message(message))
+                parse_seconds += time.perf_counter() - parse_started
+                scanned_messages += 1
+                scanned_embeds += len(message.embeds)
+            profiling.add_stage("история: ожидание страниц", time.perf_counter() - window_started - parse_seconds)
+        profiling.add_stage("разбор эмбедов", parse_seconds)
+        profiling.count("сообщений прочитано", scanned_messages)
+        profiling.count("эмбедов прочитано", scanned_embeds)
+        profiling.count("страниц истории", max(1, -(-scanned_messages // HISTORY_PAGE_SIZE)))
+        if metrics:
+            metrics.record_history_scan('reports', scanned_messages, scanned_embeds, report_type=report_type)
+        return records
+
+    windows = []
+    window_start = start_time
+    while window_start < end_time:
+        window_end = min(window_start + window, end_time)
+        windows.append((window_start, window_end))
+        window_start = window_end
+
+    with profiling.stage("история канала (по окнам, всего)"):
+        results = await asyncio.gather(*(fetch_window(ws, we) for ws, we in windows))
+    profiling.count("окон истории", len(windows))
+
+    seen = set()
+    merged = []
+    for records in results:
+        for record in records:
+            key = (record.message_id, record.embed_index)
+            if key not in seen:
+                seen.add(key)
+                merged.append(record)
+    merged.sort(key=lambda record: (record.created_at, record.message_id, record.embed_index))
+    return merged
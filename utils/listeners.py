@@ -0,0 +1,17 @@
+class ListenerMixin:
+    """Подписчики на изменения хранилища: add_listener и вызов всех подписчиков через _notify.
+
+    Наследник создает в __init__ список self._listeners и задает LISTENER_ERROR — начало
+    сообщения, которое печатается, если подписчик упал. Ошибка одного подписчика не мешает остальным.
+    """
+    LISTENER_ERROR = "Ошибка в обработчике изменения"
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, payload):
+        for callback in self._listeners:
+            try:
+                callback(payload)
+            except Exception as e:
+                print(f"{self.LISTENER_ERROR}: {e}")
@@ -0,0 +1,108 @@
+import gzip
+import os
+import shutil
+import tempfile
+import discord
+
+# Лимит загрузки, если сервер неизвестен: столько Discord разрешает серверам без буста
+DEFAULT_UPLOAD_LIMIT = 10 * 1024 * 1024
+# Запас на служебные части multipart-запроса: заголовки частей и JSON сообщения
+UPLOAD_REQUEST_OVERHEAD = 64 * 1024
+# Необязательное дополнительное ограничение размера вложений (0 — только лимит сервера)
+LOG_FILE_MAX_BYTES = int(os.getenv("LOG_FILE_MAX_BYTES", 0))
+# До этого размера файл лога держится в памяти, дальше переносится во временный файл на диске
+SPOOL_MAX_MEMORY = 1024 * 1024
+# Максимум вложений в одном сообщении Discord
+MAX_FILES_PER_MESSAGE = 10
+
+
+def upload_limit(guild=None):
+    """Сколько байт вложений можно отправить одним сообщением на сервер guild.
+
+    Discord проверяет размер всего запроса, поэтому это же значение ограничивает и один файл,
+    и сумму файлов в сообщении.
+    """
+    limit = (guild.filesize_limit if guild is not None else DEFAULT_UPLOAD_LIMIT) - UPLOAD_REQUEST_OVERHEAD
+    return min(limit, LOG_FILE_MAX_BYTES) if LOG_FILE_MAX_BYTES else limit
+
+
+class LogWriter:
+    """Построчная запись лога во временный файл с ограниченным расходом памяти."""
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+
+    def write(self, text: str):
+        self.file.write(text.encode('utf-8'))
+
+    def to_discord_files(self, filename: str, max_bytes: int = None):
+        """Превращает записанный лог в вложения, каждое из которых не больше max_bytes.
+
+        Если лог не помещается целиком, он сжимается gzip, а если не помещается и сжатым —
+        делится по строкам на пронумерованные части. Без max_bytes действует лимит загрузки
+        по умолчанию; max_bytes=0 — без ограничения: лог возвращается одним несжатым файлом.
+        """
+        if max_bytes is None:
+            max_bytes = upload_limit()
+        source = self.file
+        size = source.tell()
+        source.seek(0)
+        if not max_bytes or size <= max_bytes:
+            return [discord.File(source, filename=filename)]
+
+        compressed = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        with gzip.GzipFile(filename=filename, mode='wb', fileobj=compressed) as archive:
+            shutil.copyfileobj(source, archive)
+        if compressed.tell() <= max_bytes:
+            source.close()
+            compressed.seek(0)
+            return [discord.File(compressed, filename=f"{filename}.gz")]
+        compressed.close()
+
+        source.seek(0)
+        stem, ext = os.path.splitext(filename)
+        parts = []
+        part = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        for line in source:
+            if part.tell() and part.tell() + len(line) > max_bytes:
+                parts.append(part)
+                part = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+            part.write(line)
+        parts.append(part)
+        source.close()
+
+        files = []
+        for number, part in enumerate(parts, 1):
+            part.seek(0)
+            files.append(discord.File(part, filename=f"{stem}_part{number}{ext}"))
+        return files
+
+
+def _file_size(file):
+    fp = file.fp
+    position = fp.tell()
+    size = fp.seek(0, os.SEEK_END) - position
+    fp.seek(position)
+    return size
+
+
+def group_files(files, max_bytes):
+    """Раскладывает вложения по сообщениям: не больше MAX_FILES_PER_MESSAGE штук и max_bytes суммарно."""
+    groups = []
+    group, group_size = [], 0
+    for file in files:
+        size = _file_size(file)
+        if group and (len(group) >= MAX_FILES_PER_MESSAGE or group_size + size > max_bytes):
+            groups.append(group)
+            group, group_size = [], 0
+        group.append(file)
+        group_size += size
+    if group:
+        groups.append(group)
+    return groups
+
+
+async def send_log_files(channel, files):
+    """Отправляет вложения в канал, укладывая каждое сообщение в лимит загрузки сервера канала."""
+    for group in group_files(files, upload_limit(channel.guild)):
+        await channel.send(files=group)
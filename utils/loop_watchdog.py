@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+# Через сколько секунд без отклика цикл событий считается заблокированным
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", 0.5))
+# Как часто цикл событий отмечается и проверяется
+LOOP_CHECK_INTERVAL = 0.1
+# Сколько последних кадров стека выводить
+STACK_SAMPLE_DEPTH = 15
+
+
+class LoopWatchdog:
+    """Следит за задержкой цикла событий asyncio.
+
+    Задача в цикле регулярно отмечается и измеряет, насколько позже запланированного она
+    просыпается. Отдельный поток замечает, что отметок нет дольше порога, и сразу выводит стек
+    потока цикла, снятый через sys._current_frames, — так виден код, который блокирует цикл.
+    Когда цикл освобождается, в журнал пишется полная длительность блокировки.
+    """
+
+    def __init__(self, threshold=LOOP_LAG_THRESHOLD, interval=LOOP_CHECK_INTERVAL, metrics=None):
+        self.threshold = threshold
+        self.interval = interval
+        self.metrics = metrics
+        self.max_lag = 0.0
+        self.blocked_count = 0
+        self.last_block = None
+        self._last_beat = time.monotonic()
+        self._loop_thread_id = None
+        self._sampled_beat = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+            self.max_lag = max(self.max_lag, lag)
+            if self.metrics:
+                self.metrics.observe('loop_lag_seconds', lag)
+            if lag >= self.threshold:
+                self.blocked_count += 1
+                self.last_block = (time.time(), lag)
+                if self.metrics:
+                    self.metrics.inc('loop_blocked_total')
+                    self.metrics.inc('loop_blocked_seconds_total', lag)
+                print(f"Цикл событий был заблокирован на {lag:.2f} с.")
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            last_beat = self._last_beat
+            stalled = time.monotonic() - last_beat
+            # Стек снимается один раз за блокировку
+            if stalled < self.threshold or self._sampled_beat == last_beat:
+                continue
+            self._sampled_beat = last_beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = ''.join(traceback.format_stack(frame)[-STACK_SAMPLE_DEPTH:]).rstrip()
+            print(f"Цикл событий не отвечает уже {stalled:.2f} с. Стек потока цикла:\n{stack}")
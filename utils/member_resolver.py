@@ -0,0 +1,83 @@
+import asyncio
+import time
+import discord
+from utils import profiling
+
+# Сколько секунд хранится найденное имя участника
+MEMBER_CACHE_TTL = 600
+# Максимум одновременных REST-запросов fetch_member
+FETCH_CONCURRENCY = 5
+# Максимум id в одном запросе участников через шлюз
+QUERY_BATCH_SIZE = 100
+
+
+class MemberNameResolver:
+    """Определяет отображаемые имена участников сервера. Кэш общий для всех команд."""
+
+    def __init__(self, ttl=MEMBER_CACHE_TTL, concurrency=FETCH_CONCURRENCY, metrics=None):
+        self.ttl = ttl
+        self.metrics = metrics
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def _remember(self, guild_id, user_id, name):
+        self._cache[(guild_id, user_id)] = (name, time.monotonic() + self.ttl)
+
+    async def resolve(self, guild: discord.Guild, user_ids):
+        """Возвращает словарь user_id -> отображаемое имя ("ID ..." для тех, кого нет на сервере)."""
+        now = time.monotonic()
+        names = {}
+        pending = []
+        for user_id in set(user_ids):
+            cached = self._cache.get((guild.id, user_id))
+            if cached and cached[1] > now:
+                names[user_id] = cached[0]
+                self.hits += 1
+                continue
+            self.misses += 1
+            member = guild.get_member(user_id)
+            if member:
+                names[user_id] = member.display_name
+                self._remember(guild.id, user_id, member.display_name)
+            else:
+                pending.append(user_id)
+
+        # Сначала пакетный запрос через шлюз, затем REST для оставшихся
+        for i in range(0, len(pending), QUERY_BATCH_SIZE):
+            batch = pending[i:i + QUERY_BATCH_SIZE]
+            if self.metrics:
+                self.metrics.inc('member_lookups_total', len(batch), method='query_members')
+            try:
+                members = await guild.query_members(user_ids=batch, limit=len(batch), cache=True)
+            except (asyncio.TimeoutError, discord.ClientException) as e:
+                print(f"Не удалось запросить участников через шлюз: {e}")
+                members = []
+            for member in members:
+                names[member.id] = member.display_name
+                self._remember(guild.id, member.id, member.display_name)
+
+        remaining = [user_id for user_id in pending if user_id not in names]
+        if remaining:
+            fetched = await asyncio.gather(*(self._fetch_name(guild, user_id) for user_id in remaining))
+            names.update(zip(remaining, fetched))
+        return names
+
+    async def _fetch_name(self, guild: discord.Guild, user_id: int):
+        async with self._semaphore:
+            profiling.count("запросов fetch_member")
+            if self.metrics:
+                self.metrics.inc('member_lookups_total', method='fetch_member')
+            try:
+                member = await guild.fetch_member(user_id)
+            except discord.NotFound:
+                name = f"ID {user_id}"
+            except discord.HTTPException as e:
+                # Временную ошибку не кэшируем, чтобы следующий отчет попробовал снова
+                print(f"Ошибка при получении участника {user_id}: {e}")
+                return f"ID {user_id}"
+            else:
+                name = member.display_name
+        self._remember(guild.id, user_id, name)
+        return name
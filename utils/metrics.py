@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import math
+import re
+import time
+from contextlib import contextmanager
+
+# Границы корзин гистограмм длительности, в секундах
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Сколько сообщений Discord отдает за один запрос истории
+HISTORY_PAGE_SIZE = 100
+
+_ID_RE = re.compile(r'/\d{5,}')
+_API_PREFIX_RE = re.compile(r'^https?://[^/]+/api/v\d+')
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sort_key(item):
+    (name, labels), _ = item
+    return name, [(k, str(v)) for k, v in labels]
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(LATENCY_BUCKETS) and value > LATENCY_BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Оценка квантиля по корзинам: верхняя граница корзины, в которую он попадает."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound
+        return math.inf
+
+
+class Metrics:
+    """Счетчики и гистограммы работы бота в памяти процесса.
+
+    Метрика определяется именем и набором меток. Значения, которые удобнее прочитать в момент
+    выгрузки (например, попадания в кэши), регистрируются через add_collector.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._help = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def add_collector(self, callback):
+        """callback возвращает список (имя, метки, значение) на момент выгрузки."""
+        self._collectors.append(callback)
+
+    def record_history_scan(self, source, messages, embeds, calls=1, report_type=None):
+        """Учет прочитанной истории канала. Страницы считаются так, как их запрашивает discord.py.
+
+        report_type — тип отчета, ради которого читалась история (для чтения истории отчетами).
+        """
+        labels = {'source': source} if report_type is None else {'source': source, 'report_type': report_type}
+        self.inc('history_messages_total', messages, **labels)
+        self.inc('history_embeds_total', embeds, **labels)
+        self.inc('history_pages_total', max(calls, math.ceil(messages / HISTORY_PAGE_SIZE)), **labels)
+
+    # --- Чтение ---
+
+    def counter(self, name, **labels):
+        return self._counters.get(self._key(name, labels), 0)
+
+    def counters(self, name):
+        """Все значения счетчика: словарь "метки -> значение"."""
+        return {labels: value for (metric, labels), value in self._counters.items() if metric == name}
+
+    def histograms(self, name):
+        return {labels: h for (metric, labels), h in self._histograms.items() if metric == name}
+
+    def collected(self):
+        values = []
+        for callback in self._collectors:
+            try:
+                values.extend(callback())
+            except Exception as e:
+                print(f"Ошибка при сборе метрик: {e}")
+        return values
+
+    # --- Выгрузка в формате Prometheus ---
+
+    @staticmethod
+    def _format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        body = ','.join(f'{k}="{_escape_label(v)}"' for k, v in pairs)
+        return '{' + body + '}'
+
+    def to_prometheus(self, prefix='elysium_'):
+        lines = []
+        seen_types = set()
+
+        def header(name, kind):
+            if name in seen_types:
+                return
+            seen_types.add(name)
+            if name in self._help:
+                lines.append(f"# HELP {prefix}{name} {self._help[name]}")
+            lines.append(f"# TYPE {prefix}{name} {kind}")
+
+        for (name, labels), value in sorted(self._counters.items(), key=_sort_key):
+            header(name, 'counter')
+            lines.append(f"{prefix}{name}{self._format_labels(labels)} {value}")
+
+        for (name, labels), histogram in sorted(self._histograms.items(), key=_sort_key):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f"{prefix}{name}_bucket{self._format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{prefix}{name}_bucket{self._format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+            lines.append(f"{prefix}{name}_sum{self._format_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{prefix}{name}_count{self._format_labels(labels)} {histogram.count}")
+
+        for name, labels, value in self.collected():
+            header(name, 'gauge')
+            lines.append(f"{prefix}{name}{self._format_labels(sorted(labels.items()))} {value}")
+
+        header('uptime_seconds', 'gauge')
+        lines.append(f"{prefix}uptime_seconds {time.time() - self.started_at:.0f}")
+        return '\n'.join(lines) + '\n'
+
+
+class DiscordHTTPMetricsHandler(logging.Handler):
+    """Считает REST-запросы, ответы 429 и исчерпанные корзины по журналу discord.http.
+
+    discord.py сам соблюдает ограничения частоты и сообщает о запросах и ответах 429 только
+    в журнал, поэтому обработчик разбирает аргументы его записей. На глобальный 429 discord.py
+    пишет две строки: сначала общую строку маршрута, затем строку о глобальном ограничении,
+    без ожидания между ними. Поэтому строка маршрута учитывается отложенно, на следующем шаге
+    цикла событий, и отбрасывается, если за ней пришла строка о глобальном ограничении.
+    """
+
+    def __init__(self, metrics):
+        super().__init__(level=logging.DEBUG)
+        self.metrics = metrics
+        self._pending_route_limit = None
+
+    @staticmethod
+    def _route(url):
+        return _ID_RE.sub('/{id}', _API_PREFIX_RE.sub('', str(url).split('?', 1)[0]))
+
+    def emit(self, record):
+        try:
+            message, args = record.msg, record.args or ()
+            if message == '%s %s with %s has returned %s':
+                method, url, _, status = args
+                self.metrics.inc('rest_requests_total', method=method, route=self._route(url), status=status)
+            elif isinstance(message, str) and message.startswith('We are being rate limited.') and 'Retrying in' in message:
+                method, url, retry_after = args
+                self._flush_route_limit()
+                self._pending_route_limit = (self._route(url), retry_after)
+                try:
+                    asyncio.get_running_loop().call_soon(self._flush_route_limit)
+                except RuntimeError:
+                    self._flush_route_limit()
+            elif isinstance(message, str) and message.startswith('A rate limit bucket (%s) has been exhausted'):
+                # Длительности паузы в записи нет, а ждет только следующий запрос в корзину до ее сброса,
+                # поэтому считается лишь число исчерпаний, без секунд ожидания
+                self.metrics.inc('rate_limit_bucket_exhausted_total')
+            elif isinstance(message, str) and message.startswith('Global rate limit has been hit'):
+                # Тот же ответ 429 уже записан строкой маршрута — он учитывается один раз, как глобальный
+                self._pending_route_limit = None
+                self.metrics.inc('rate_limit_hits_total', scope='global', route='*')
+                self.metrics.inc('rate_limit_wait_seconds_total', args[0])
+        except Exception:
+            self.handleError(record)
+
+    def _flush_route_limit(self):
+        if self._pending_route_limit is None:
+            return
+        route, retry_after = self._pending_route_limit
+        self._pending_route_limit = None
+        self.metrics.inc('rate_limit_hits_total', scope='route', route=route)
+        self.metrics.inc('rate_limit_wait_seconds_total', retry_after)
+
+
+def install_discord_http_metrics(metrics):
+    """Подключает DiscordHTTPMetricsHandler к журналу discord.http.
+
+    Если логирование не настроено, предупреждения discord.http (в том числе об ответах 429)
+    выводятся в stderr отдельным обработчиком: с обработчиком метрик logging.lastResort их уже не покажет.
+    """
+    logger = logging.getLogger('discord.http')
+    if any(isinstance(handler, DiscordHTTPMetricsHandler) for handler in logger.handlers):
+        return
+    if not logging.getLogger().handlers and not logging.getLogger('discord').handlers:
+        stderr_handler = logging.StreamHandler()
+        stderr_handler.setLevel(logging.WARNING)
+        stderr_handler.setFormatter(logging.Formatter('[{asctime}] [{levelname}] {name}: {message}', '%Y-%m-%d %H:%M:%S', style='{'))
+        logger.addHandler(stderr_handler)
+    logger.addHandler(DiscordHTTPMetricsHandler(metrics))
+    # Отладочные записи нужны обработчику метрик; обработчик stderr пропускает только предупреждения
+    logger.setLevel(logging.DEBUG)
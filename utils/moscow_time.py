@@ -0,0 +1,25 @@
+from datetime import datetime
+from functools import lru_cache
+
+import pytz
+
+MOSCOW_TZ = pytz.timezone('Europe/Moscow')
+
+
+@lru_cache(maxsize=4096)
+def _hour_offset(tz, hour):
+    return int(datetime.fromtimestamp(hour * 3600, tz).utcoffset().total_seconds())
+
+
+def utc_offset(ts, tz=MOSCOW_TZ):
+    """Смещение часового пояса от UTC в секундах в момент ts (секунды эпохи).
+
+    Смены смещения приходятся на целые часы UTC, поэтому результат кэшируется по часам:
+    в пакетных расчетах pytz вызывается один раз на час, а не на каждый ивент.
+    """
+    return _hour_offset(tz, int(ts // 3600))
+
+
+def moscow_day(ts):
+    """Московская дата момента ts в формате ГГГГ-ММ-ДД."""
+    return datetime.fromtimestamp(ts, MOSCOW_TZ).date().isoformat()
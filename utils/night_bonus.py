@@ -0,0 +1,114 @@
+from array import array
+from typing import NamedTuple
+
+from utils.moscow_time import MOSCOW_TZ, utc_offset
+
+DAY_SECONDS = 24 * 60 * 60
+
+# Настройки по умолчанию, если файла night_bonus.json нет: группа -> окно и множитель.
+# Группа 'blum' — участники списка Blum, 'default' — все остальные.
+DEFAULT_NIGHT_BONUS = {
+    'blum': {'start': '02:00', 'end': '08:00', 'multiplier': 2.0},
+    'default': {'start': '03:00', 'end': '07:00', 'multiplier': 1.5},
+}
+
+
+class NightWindow(NamedTuple):
+    """Ежедневное ночное окно: смещение начала от полуночи и длина в секундах."""
+    offset: int
+    length: int
+    multiplier: float
+
+
+def _clock_seconds(value: str) -> int:
+    hours, minutes = value.split(':')
+    return int(hours) * 3600 + int(minutes) * 60
+
+
+def parse_window(settings: dict) -> NightWindow:
+    """Окно из настроек группы. Если конец раньше начала (например, 23:00-05:00), окно переходит через полночь."""
+    start = _clock_seconds(settings['start'])
+    end = _clock_seconds(settings['end'])
+    length = (end - start) % DAY_SECONDS
+    if not 0 <= start < DAY_SECONDS:
+        raise ValueError(f"Некорректное начало ночного окна: {settings['start']}")
+    return NightWindow(start, length, float(settings.get('multiplier', 1.0)))
+
+
+def overlap_seconds(starts, ends, offsets, lengths, tz=MOSCOW_TZ):
+    """Сколько секунд каждого интервала [start, end) попадает в ночные окна всех суток.
+
+    Все аргументы — столбцы одинаковой длины (секунды эпохи для интервалов, секунды от полуночи
+    для окон; полночь — по часовому поясу tz). Пересечение считается за O(1) на интервал через накопленную длину окон до момента t:
+    G(t) = k * length + min(r, length), где k, r = divmod(t - offset, сутки). Поэтому интервалы,
+    проходящие через полночь или через несколько ночей, учитываются целиком.
+    """
+    result = array('d')
+    for start, end, offset, length in zip(starts, ends, offsets, lengths):
+        if end <= start or length <= 0:
+            result.append(0.0)
+            continue
+        k_end, r_end = divmod(end + utc_offset(end, tz) - offset, DAY_SECONDS)
+        k_start, r_start = divmod(start + utc_offset(start, tz) - offset, DAY_SECONDS)
+        result.append((k_end - k_start) * length + min(r_end, length) - min(r_start, length))
+    return result
+
+
+class NightBonusEngine:
+    """Пакетный расчет ночных бонусов по группам участников.
+
+    settings — словарь "группа -> {'start', 'end', 'multiplier', ['users']}" в порядке приоритета.
+    group_members дополняет группы участниками извне (например, {'blum': список Blum}).
+    Группа 'default' действует для всех, кто не попал в другие группы.
+    """
+
+    def __init__(self, settings: dict, group_members: dict = None, tz=MOSCOW_TZ):
+        self.tz = tz
+        self.groups = []
+        self.default = None
+        group_members = group_members or {}
+        for name, group_settings in settings.items():
+            window = parse_window(group_settings)
+            if name == 'default':
+                self.default = window
+                continue
+            members = {int(uid) for uid in group_settings.get('users', [])}
+            members.update(group_members.get(name, ()))
+            self.groups.append((members, window))
+        windows = [window for _, window in self.groups]
+        if self.default:
+            windows.append(self.default)
+        self.windows = windows
+
+    def window_for(self, user_id):
+        for members, window in self.groups:
+            if user_id in members:
+                return window
+        return self.default
+
+    def night_mask(self, starts, ends):
+        """Флаги "интервал пересекается хотя бы с одним ночным окном" — фильтр ночного лога."""
+        n = len(starts)
+        mask = [False] * n
+        for window in self.windows:
+            overlaps = overlap_seconds(starts, ends, [window.offset] * n, [window.length] * n, self.tz)
+            mask = [flag or overlap > 0 for flag, overlap in zip(mask, overlaps)]
+        return mask
+
+    def bonuses(self, user_ids, starts, ends):
+        """Возвращает столбцы множителей, ночных минут и бонусных баллов для пакета ивентов.
+
+        Минуты пересечения и бонус округляются так же, как в ночном логе: round(минуты * (множитель - 1)).
+        У участников без группы множитель 1.0 и нулевой бонус.
+        """
+        windows = [self.window_for(user_id) for user_id in user_ids]
+        offsets = array('l', (window.offset if window else 0 for window in windows))
+        lengths = array('l', (window.length if window else 0 for window in windows))
+        multipliers = array('d', (window.multiplier if window else 1.0 for window in windows))
+        overlaps = overlap_seconds(starts, ends, offsets, lengths, self.tz)
+        bonus_minutes = array('l', (round(overlap / 60) for overlap in overlaps))
+        bonus_points = array('l', (
+            round(minutes * (multiplier - 1.0)) if minutes > 0 else 0
+            for minutes, multiplier in zip(bonus_minutes, multipliers)
+        ))
+        return multipliers, bonus_minutes, bonus_points
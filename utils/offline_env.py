@@ -0,0 +1,13 @@
+import os
+
+# Переменные окружения, которые main.py и коги читают при создании бота
+BOT_ENV_VARS = ('DISCORD_TOKEN', 'PARSE_CHANNEL_ID', 'LOG_CHANNEL_ID', 'ADMIN_ROLE_ID')
+
+
+def stub_bot_env():
+    """Подставляет '0' в незаданные переменные бота: без подключения к Discord каналы и роли не используются.
+
+    Вызывается до импорта main.py и когов.
+    """
+    for name in BOT_ENV_VARS:
+        os.environ.setdefault(name, '0')
@@ -0,0 +1,303 @@
+import asyncio
+import bisect
+import json
+import os
+from datetime import datetime
+from utils.listeners import ListenerMixin
+
+# После скольких записей в журнале он сворачивается в новый снимок
+JOURNAL_COMPACT_THRESHOLD = 500
+# Поля, без которых запись нельзя проиндексировать
+REQUIRED_ENTRY_FIELDS = ('entry_id', 'user_id', 'points', 'event_name', 'end_time_iso')
+
+
+class PointsStore(ListenerMixin):
+    """Хранилище ручных начислений: снимок manual_points.json и журнал изменений в формате JSONL.
+
+    Изменения дописываются в журнал фоновой задачей: все изменения, накопившиеся за время
+    предыдущей записи, сохраняются одной записью с fsync. В памяти изменение применяется только
+    после успешной записи, поэтому неудачная запись не оставляет в хранилище несохраненных данных.
+    """
+
+    def __init__(self, snapshot_file, journal_file=None):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file or os.path.splitext(snapshot_file)[0] + '.journal.jsonl'
+        self._entries = {}
+        # Вторичные индексы: user_id -> {entry_id: запись}, original_message_id -> {entry_id: запись}
+        self._by_user = {}
+        self._by_message = {}
+        # Записи, упорядоченные по времени окончания: отсортированный список (end_ts, entry_id)
+        self._timeline = []
+        self._end_ts = {}
+        self._journal_ops = 0
+        self._pending = []
+        self._writer_task = None
+        self._listeners = []
+        # Проверка «есть ли уже запись для отчета» и запись должны идти одной операцией
+        self._override_lock = asyncio.Lock()
+        self._load()
+
+    # --- Загрузка ---
+
+    def _load(self):
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                for entry in json.load(f):
+                    try:
+                        self._apply({'op': 'add', 'entry': entry})
+                    except Exception as e:
+                        print(f"Снимок ручных баллов: пропущена некорректная запись {entry!r}: {e}")
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+        torn_tail = False
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        op = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Оборванная последняя строка после сбоя во время записи
+                        torn_tail = True
+                        break
+                    try:
+                        self._apply(op)
+                    except Exception as e:
+                        print(f"Журнал ручных баллов: пропущено некорректное изменение {line.strip()[:200]}: {e}")
+                    self._journal_ops += 1
+        except FileNotFoundError:
+            pass
+
+        if torn_tail:
+            print("Журнал ручных баллов поврежден в конце, выполняется сжатие в снимок.")
+            self._write_batch([], self._snapshot())
+            self._journal_ops = 0
+
+    # --- Уведомления ---
+
+    # Подписчики получают список отметок времени (секунды эпохи), затронутых изменением
+    LISTENER_ERROR = "Ошибка в обработчике изменения ручных баллов"
+
+    # --- Применение изменений ---
+
+    def _index(self, entry):
+        end_ts = datetime.fromisoformat(entry['end_time_iso']).timestamp()
+        self._end_ts[entry['entry_id']] = end_ts
+        bisect.insort(self._timeline, (end_ts, entry['entry_id']))
+        self._by_user.setdefault(entry['user_id'], {})[entry['entry_id']] = entry
+        message_id = entry.get('original_message_id')
+        if message_id:
+            self._by_message.setdefault(message_id, {})[entry['entry_id']] = entry
+
+    def _unindex(self, entry):
+        end_ts = self._end_ts.pop(entry['entry_id'])
+        del self._timeline[bisect.bisect_left(self._timeline, (end_ts, entry['entry_id']))]
+        for index, key in ((self._by_user, entry['user_id']), (self._by_message, entry.get('original_message_id'))):
+            bucket = index.get(key)
+            if bucket is None:
+                continue
+            bucket.pop(entry['entry_id'], None)
+            if not bucket:
+                del index[key]
+
+    @staticmethod
+    def _normalize_time(value):
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except (TypeError, ValueError):
+            raise ValueError(f"Неверное время окончания записи: {value!r}")
+
+    def _validated(self, op):
+        """Проверяет и нормализует изменение до записи в журнал.
+
+        В журнал не должно попасть изменение, которое не применится: при загрузке оно бы
+        не дало запустить бота.
+        """
+        kind = op['op']
+        if kind == 'add':
+            entry = dict(op['entry'])
+            missing = [field for field in REQUIRED_ENTRY_FIELDS if field not in entry]
+            if missing:
+                raise ValueError(f"В ручной записи нет полей: {', '.join(missing)}")
+            entry['end_time_iso'] = self._normalize_time(entry['end_time_iso'])
+            return {'op': 'add', 'entry': entry}
+        if kind == 'update':
+            changes = dict(op['changes'])
+            if 'entry_id' in changes:
+                raise ValueError("Идентификатор ручной записи изменить нельзя.")
+            if 'end_time_iso' in changes:
+                changes['end_time_iso'] = self._normalize_time(changes['end_time_iso'])
+            return {'op': 'update', 'entry_id': op['entry_id'], 'changes': changes}
+        if kind == 'remove':
+            return {'op': 'remove', 'entry_id': op['entry_id']}
+        raise ValueError(f"Неизвестное изменение ручных баллов: {kind!r}")
+
+    def _apply(self, op):
+        # Время окончания разбирается до изменения индексов, чтобы ошибка не оставила их рассогласованными
+        kind = op['op']
+        if kind == 'add':
+            entry = dict(op['entry'])
+            datetime.fromisoformat(entry['end_time_iso'])
+            previous = self._entries.get(entry['entry_id'])
+            if previous is not None:
+                self._unindex(previous)
+            self._entries[entry['entry_id']] = entry
+            self._index(entry)
+        elif kind == 'update':
+            entry = self._entries.get(op['entry_id'])
+            if entry is not None:
+                datetime.fromisoformat({**entry, **op['changes']}['end_time_iso'])
+                self._unindex(entry)
+                entry.update(op['changes'])
+                self._index(entry)
+        elif kind == 'remove':
+            entry = self._entries.pop(op['entry_id'], None)
+            if entry is not None:
+                self._unindex(entry)
+
+    def entries(self):
+        """Возвращает список всех записей. Сами записи изменять нельзя — только через методы хранилища."""
+        return list(self._entries.values())
+
+    def get(self, entry_id):
+        return self._entries.get(entry_id)
+
+    def end_ts(self, entry_id):
+        """Время окончания записи в секундах эпохи."""
+        return self._end_ts[entry_id]
+
+    def in_range(self, start_ts, end_ts):
+        """Возвращает записи с окончанием в [start_ts, end_ts) в хронологическом порядке."""
+        lo = bisect.bisect_left(self._timeline, (start_ts,))
+        hi = bisect.bisect_left(self._timeline, (end_ts,))
+        return [self._entries[entry_id] for _, entry_id in self._timeline[lo:hi]]
+
+    def latest(self, count):
+        """Возвращает count последних по времени записей, начиная с самой поздней."""
+        return [self._entries[entry_id] for _, entry_id in reversed(self._timeline[-count:])] if count > 0 else []
+
+    def for_user(self, user_id):
+        return list(self._by_user.get(user_id, {}).values())
+
+    def by_original_message(self, message_id):
+        """Возвращает ручную запись, переопределяющую баллы за отчет message_id, или None."""
+        bucket = self._by_message.get(message_id)
+        return next(iter(bucket.values())) if bucket else None
+
+    def edited_message_ids(self):
+        """Множество id отчетов, баллы за которые переопределены ручными записями."""
+        return self._by_message.keys()
+
+    async def add(self, entry):
+        await self._commit({'op': 'add', 'entry': entry})
+
+    async def update(self, entry_id, **changes):
+        await self._commit({'op': 'update', 'entry_id': entry_id, 'changes': changes})
+
+    async def remove(self, entry_id):
+        await self._commit({'op': 'remove', 'entry_id': entry_id})
+
+    async def set_override(self, entry, **changes):
+        """Переопределяет баллы за отчет entry['original_message_id'].
+
+        Если для отчета уже есть ручная запись, к ней применяются changes, иначе добавляется entry.
+        Изменение попадает в память только после записи на диск, поэтому проверка и запись
+        выполняются под блокировкой: два одновременных изменения одного отчета не создадут двух записей.
+        """
+        async with self._override_lock:
+            existing = self.by_original_message(entry['original_message_id'])
+            if existing is not None:
+                await self.update(existing['entry_id'], **changes)
+            else:
+                await self.add(entry)
+
+    # --- Запись на диск ---
+
+    async def _commit(self, op):
+        # Ошибки проверки и сериализации получает вызывающий, а в журнал такое изменение не попадает
+        op = self._validated(op)
+        line = json.dumps(op, ensure_ascii=False)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((op, line, future))
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer())
+        await future
+
+    def _apply_and_notify(self, op):
+        entry_id = op['entry']['entry_id'] if op['op'] == 'add' else op['entry_id']
+        previous_ts = self._end_ts.get(entry_id)
+        self._apply(op)
+        current_ts = self._end_ts.get(entry_id)
+        self._notify([ts for ts in {previous_ts, current_ts} if ts is not None])
+
+    async def _writer(self):
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                snapshot = None
+                try:
+                    ops = [op for op, _, _ in batch]
+                    lines = [line for _, line, _ in batch]
+                    journal_ops = self._journal_ops + len(ops)
+                    if journal_ops >= JOURNAL_COMPACT_THRESHOLD:
+                        # Снимок берется в потоке цикла: текущие записи вместе с изменениями пакета
+                        snapshot = self._snapshot(ops)
+                    await asyncio.to_thread(self._write_batch, lines, snapshot)
+                except Exception as e:
+                    print(f"Ошибка записи ручных баллов на диск: {e}")
+                    for _, _, future in batch:
+                        # Ожидание могло быть отменено, пока изменение стояло в очереди
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                self._journal_ops = 0 if snapshot is not None else journal_ops
+                for op, _, future in batch:
+                    try:
+                        self._apply_and_notify(op)
+                    except Exception as e:
+                        print(f"Ошибка применения изменения ручных баллов: {e}")
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(None)
+        finally:
+            self._writer_task = None
+
+    def _snapshot(self, ops=()):
+        entries = {entry_id: dict(entry) for entry_id, entry in self._entries.items()}
+        for op in ops:
+            if op['op'] == 'add':
+                entries[op['entry']['entry_id']] = dict(op['entry'])
+            elif op['op'] == 'update' and op['entry_id'] in entries:
+                entries[op['entry_id']].update(op['changes'])
+            elif op['op'] == 'remove':
+                entries.pop(op['entry_id'], None)
+        return list(entries.values())
+
+    def _write_batch(self, lines, snapshot):
+        if snapshot is not None:
+            tmp_file = self.snapshot_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+            # Все операции журнала уже учтены в снимке. Если сбой случится до очистки журнала,
+            # повторное применение операций при загрузке ничего не изменит.
+            with open(self.journal_file, 'w', encoding='utf-8'):
+                pass
+            return
+
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def flush(self):
+        """Дожидается записи всех накопленных изменений."""
+        while self._writer_task is not None:
+            await asyncio.shield(self._writer_task)
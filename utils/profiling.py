@@ -0,0 +1,79 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_profile = ContextVar('report_profile', default=None)
+
+
+class Profile:
+    """Поэтапные замеры одного запроса отчета: время по этапам и счетчики.
+
+    Профиль хранится в contextvar, поэтому задачи, запущенные из запроса (например, параллельное
+    чтение окон истории), пишут в тот же профиль. Время параллельных этапов суммируется,
+    так что сумма этапов может превышать общее время.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+
+    def add_stage(self, name, seconds):
+        total, calls = self.stages.get(name, (0.0, 0))
+        self.stages[name] = (total + seconds, calls + 1)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def format(self):
+        elapsed = time.perf_counter() - self.started
+        width = max((len(name) for name in self.stages), default=0)
+        lines = [f"Профиль запроса: всего {elapsed * 1000:.1f} мс"]
+        for name, (seconds, calls) in self.stages.items():
+            share = seconds / elapsed if elapsed else 0
+            lines.append(f"{name:<{width}}  {seconds * 1000:9.1f} мс  {share:5.0%}  ×{calls}")
+        if self.counters:
+            lines.append("")
+            lines.extend(f"{name}: {value}" for name, value in self.counters.items())
+        return "\n".join(lines)
+
+
+@contextmanager
+def profiling():
+    """Включает профилирование для текущего контекста и отдает объект Profile."""
+    profile = Profile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def current_profile():
+    return _current_profile.get()
+
+
+@contextmanager
+def stage(name):
+    """Засекает этап, если для текущего запроса включено профилирование."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_stage(name, time.perf_counter() - start)
+
+
+def add_stage(name, seconds):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.add_stage(name, seconds)
+
+
+def count(name, value=1):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.count(name, value)
@@ -0,0 +1,93 @@
+import time
+from collections import OrderedDict, deque
+
+# Сколько разных отчетов хранится одновременно
+REPORT_CACHE_SIZE = 64
+# Сколько секунд хранится результат отчета
+REPORT_CACHE_TTL = 30 * 60
+# Сколько последних инвалидаций помнит кэш, чтобы не сохранить результат, устаревший во время сборки
+INVALIDATION_LOG_SIZE = 256
+
+
+class ReportCache:
+    """LRU-кэш собранных ивентов отчетов с TTL и точечной инвалидацией.
+
+    Каждая запись помнит свой период [start_ts, end_ts), поэтому изменение отчета или ручной
+    записи сбрасывает только те результаты, в период которых попадает время изменения.
+
+    Отчет собирается с ожиданиями, и инвалидация может прийти до того, как результат попадет
+    в кэш. Поэтому перед сборкой берется generation(), а put с этим значением ничего не сохраняет,
+    если с тех пор был сброшен период результата.
+    """
+
+    def __init__(self, max_size=REPORT_CACHE_SIZE, ttl=REPORT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0
+        # (номер инвалидации, отметки времени или None, если сброшено все)
+        self._invalidations = deque(maxlen=INVALIDATION_LOG_SIZE)
+
+    def get(self, key):
+        item = self._entries.get(key)
+        if item is None or item[0] <= time.monotonic():
+            if item is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return item[3]
+
+    def generation(self):
+        """Номер последней инвалидации: передается в put для результата, собранного после этого момента."""
+        return self._generation
+
+    def _invalidated_since(self, generation, start_ts, end_ts):
+        if generation < self._generation - len(self._invalidations):
+            # Часть инвалидаций уже вытеснена из журнала — результат считается устаревшим
+            return True
+        for number, timestamps in reversed(self._invalidations):
+            if number <= generation:
+                break
+            if timestamps is None or any(start_ts <= ts < end_ts for ts in timestamps):
+                return True
+        return False
+
+    def _record_invalidation(self, timestamps):
+        self._generation += 1
+        self._invalidations.append((self._generation, timestamps))
+
+    def put(self, key, start_ts, end_ts, value, ttl=None, generation=None):
+        if generation is not None and self._invalidated_since(generation, start_ts, end_ts):
+            return
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), start_ts, end_ts, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_times(self, timestamps):
+        """Сбрасывает результаты, в период которых попадает хотя бы одна из отметок времени."""
+        if not timestamps:
+            return
+        self._record_invalidation(tuple(timestamps))
+        if not self._entries:
+            return
+        stale = [
+            key for key, (_, start_ts, end_ts, _) in self._entries.items()
+            if any(start_ts <= ts < end_ts for ts in timestamps)
+        ]
+        for key in stale:
+            del self._entries[key]
+
+    def clear(self):
+        self._record_invalidation(None)
+        self._entries.clear()
+
+    def on_config_changed(self, name):
+        # Категории записаны в каждом собранном ивенте, а ночные окна определяют состав ночного лога.
+        # Список Blum влияет только на оформление ночного лога, которое не кэшируется.
+        if name in ('categories', 'night_bonus'):
+            self.clear()
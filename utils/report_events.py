@@ -0,0 +1,29 @@
+import sys
+from datetime import datetime
+
+
+class ReportEvent:
+    """Ивент в собранном отчете.
+
+    Вместо словаря — объект со __slots__: без словаря атрибутов на каждый ивент, а ник
+    и название ивента интернируются, так что повторяющиеся строки хранятся один раз.
+    timestamp — время окончания в секундах эпохи (для ивентов из суточной сводки — None),
+    count — сколько ивентов объединено в записи (больше 1 только в сводке).
+    """
+    __slots__ = ('user_id', 'user_nick', 'points', 'event_name', 'timestamp', 'count', 'category')
+
+    def __init__(self, user_id, user_nick, points, event_name, timestamp, count=1, category='Other'):
+        self.user_id = user_id
+        self.user_nick = sys.intern(user_nick) if user_nick is not None else None
+        self.points = points
+        self.event_name = sys.intern(event_name)
+        self.timestamp = timestamp
+        self.count = count
+        self.category = category
+
+    def end_time(self, tz):
+        return datetime.fromtimestamp(self.timestamp, tz)
+
+    def __repr__(self):
+        return (f"ReportEvent(user_id={self.user_id}, event_name={self.event_name!r}, points={self.points}, "
+                f"timestamp={self.timestamp}, count={self.count}, category={self.category!r})")
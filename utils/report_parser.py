@@ -0,0 +1,62 @@
+import re
+from typing import NamedTuple, Optional
+
+REPORT_TITLE = "Отчет о проведенном ивенте"
+
+_MENTION_RE = re.compile(r'<@(\d+)>')
+_NUMBER_RE = re.compile(r'\d+')
+
+
+class ReportRecord(NamedTuple):
+    """Один отчет об ивенте. Порядок полей совпадает с колонками таблицы events."""
+    message_id: int
+    embed_index: int
+    user_id: int
+    user_nick: str
+    points: int
+    event_name: str
+    created_at: float
+
+
+def _clean(value: str) -> str:
+    return value.replace('`', '').strip()
+
+
+def parse_report_embed(message_id: int, embed_index: int, created_at: float, embed) -> Optional[ReportRecord]:
+    """Разбирает эмбед отчета. Возвращает None, если это не отчет или в нем не указан пользователь."""
+    if embed.title != REPORT_TITLE:
+        return None
+    description = embed.description
+    if not description:
+        return None
+    match = _MENTION_RE.search(description)
+    if not match:
+        return None
+
+    user_nick = _clean(description[match.end():]) or 'N/A'
+    points = 0
+    event_name = 'Без названия'
+    for field in embed.fields:
+        clean_field_name = field.name.lower().replace('>', '').strip()
+        if clean_field_name == 'получено':
+            number = _NUMBER_RE.search(field.value or '')
+            if number:
+                points = int(number.group())
+        elif clean_field_name == 'ивент':
+            event_name = _clean(field.value or '')
+    return ReportRecord(message_id, embed_index, int(match.group(1)), user_nick, points, event_name, created_at)
+
+
+def parse_report_embeds(message_id, created_at, embeds):
+    """Возвращает записи по всем отчетам сообщения, в которых указан пользователь."""
+    timestamp = created_at.timestamp()
+    records = []
+    for index, embed in enumerate(embeds):
+        record = parse_report_embed(message_id, index, timestamp, embed)
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def parse_report_message(message):
+    return parse_report_embeds(message.id, message.created_at, message.embeds)